@@ -54,7 +54,11 @@ def init_comment_system(app: Flask, admin: Admin = None):
     print("   POST /api/comments/<comment_id>/reply - 回复评论")
     print("   GET  /api/comments/<article_url>/stats - 获取评论统计")
     print("   PUT  /api/comments/admin/<comment_id> - 管理员审核评论")
+    print("   PUT  /api/comments/admin/batch - 管理员批量审核评论")
     print("   GET  /api/comments/admin/pending - 获取待审核评论")
+    print("   POST /api/comments/admin/spam-sweep - 启动后台垃圾评论清理")
+    print("   GET  /api/comments/admin/spam-sweep/<job_id> - 查询清理任务进度")
+    print("   GET  /api/comments/admin/metrics - 评论系统运行指标")
     
     if admin:
         print("🔧 管理后台视图已注册:")
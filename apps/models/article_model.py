@@ -1,5 +1,6 @@
 import base64
 import re
+import uuid
 from datetime import datetime
 import pytz
 from flask_admin.contrib.mongoengine import ModelView
@@ -99,9 +100,12 @@ class 文章db(Document):
     ids = IntField(unique=True)
     image_url = StringField(max_length=500)
     image_title = StringField(max_length=500)
+    image_variants = DictField()  # 响应式图片清单 {'width', 'height', 'src', 'placeholder', 'variants': {格式: [[宽, url], ...]}}，placeholder 为低清占位图 data URI
+    image_job_id = StringField(max_length=100)  # 最近一次图片处理任务（图片任务db.job_id）
     article_url = StringField(max_length=500, required=True)  # 文章自定义url
     lang = StringField(max_length=500, required=True)  # 文章按语言分类
     is_update = BooleanField(default=False)
+    更新时间 = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))  # 最后修改时间，网站地图增量更新使用
 
     game_auth = StringField(max_length=500)  # 游戏作者
     game_date_published = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))  # 游戏发布时间
@@ -110,7 +114,8 @@ class 文章db(Document):
     game_aggregateRating = DictField(max_length=500)
     meta = {
         'indexes': [
-            {'fields': ['article_url', 'lang'], 'unique': True}  # 设置联合唯一索引
+            {'fields': ['article_url', 'lang'], 'unique': True},  # 设置联合唯一索引
+            {'fields': ['更新时间']}  # 网站地图按水位线查询变更
         ]
     }
 
@@ -118,6 +123,29 @@ class 文章db(Document):
         return f'{self.标题}'
 
 
+class 图片任务db(Document):
+    """文章图片后台处理任务（保存文章时入队，处理完成后回写文章的 image_url）"""
+    meta = {
+        'collection': 'image_jobs',
+        'indexes': ['job_id', 'status', 'article_id', '-created_at']
+    }
+
+    job_id = StringField(required=True, unique=True, default=lambda: str(uuid.uuid4()))
+    article_id = StringField()  # 文章保存后才写入
+    status = StringField(choices=['queued', 'running', 'completed', 'failed'], default='queued')
+    filename = StringField(max_length=500)  # 上传时的文件名
+    source_path = StringField(max_length=500)  # 暂存的原图，完成后删除
+    image_url = StringField(max_length=500)
+    error = StringField()
+    attempts = IntField(default=0)
+    created_at = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))
+    updated_at = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))
+    finished_at = DateTimeField()
+
+    def __str__(self):
+        return f'{self.job_id} - {self.status}'
+
+
 class Comment(Document):
     meta = {'collection': 'comments'}  # 指定 MongoDB 集合名
 
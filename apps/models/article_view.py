@@ -1,6 +1,7 @@
 from loguru import logger
 
-from flask import redirect, url_for
+from flask import flash, redirect, url_for
+from flask_admin.actions import action
 from flask_admin.contrib.mongoengine import ModelView
 from flask_admin import form
 from flask_login import current_user
@@ -10,9 +11,15 @@ from wtforms.fields.simple import StringField
 from wtforms.validators import DataRequired
 from flask_wtf import FlaskForm
 import os
-from apps.models.article_model import get_next_id, 分类db, 模板db, 状态db, 文章db
-from setting import UPLOAD_FOLDER_ROOT
-from tool.mpuscript import upload_file
+from datetime import datetime
+
+import pytz
+from apps.models.article_model import get_next_id, 分类db, 图片任务db, 模板db, 状态db, 文章db
+from apps.services.article_languages import article_languages
+from apps.services.image_jobs import create_image_job, new_job_id, retry_image_jobs
+from setting import IMAGE_SETTINGS, UPLOAD_FOLDER_ROOT
+from llms import schedule_llms_update
+from sitemap import schedule_sitemap_update
 
 
 class AuthView(ModelView):
@@ -38,7 +45,12 @@ class ArticleView(AuthView):
     form_extra_fields = {
         'image_load': form.ImageUploadField('Upload Images', base_path=UPLOAD_FOLDER_ROOT, )
     }
-    column_list = ('标题', '发布时间', "lang", '状态_id', "分类_id", '模板路径_id')
+    column_list = ('标题', '发布时间', "lang", '状态_id', "分类_id", '模板路径_id', 'image_job_id')
+    column_labels = {'image_job_id': '图片处理'}
+    # 图片处理任务的状态（每行按 job_id 查询一次）
+    column_formatters = {
+        'image_job_id': lambda v, c, m, p: _image_job_status(m.image_job_id)
+    }
     column_editable_list = ['状态_id', "分类_id", '模板路径_id']
     form_columns = (
         '标题', 'lang', "article_url", '标签', '正文内容', '简介', '分类_id', '发布时间', '状态_id', 'ids',
@@ -71,6 +83,14 @@ class ArticleView(AuthView):
         if is_created:
             # 当创建新记录时，自动设置 ID
             model.ids = int(get_next_id('article_id'))
+        else:
+            # 语言或 ids 改变时，原来所在的网站地图分片也要重写
+            old = 文章db._get_collection().find_one({'_id': model.pk}, projection={'lang': 1, 'ids': 1})
+            if old and (old.get('lang'), old.get('ids')) != (model.lang, model.ids):
+                schedule_sitemap_update(old.get('lang'), old.get('ids'))
+            if old and old.get('lang') != model.lang:
+                schedule_llms_update(old.get('lang'))
+        model.更新时间 = datetime.now(pytz.timezone('Asia/Shanghai'))
         # ====================
 
         # 判断是否为列表页面
@@ -79,8 +99,11 @@ class ArticleView(AuthView):
             file = form.image_load.data
             if file:
                 logger.info(file)
-                new_url = upload_file(file)
-                model.image_url = new_url
+                # 图片在后台处理，完成后回写 image_url；新文章先使用占位图，修改时保留原图片
+                # 任务在文章保存成功后创建（after_model_change），这里只预留任务ID
+                model.image_job_id = new_job_id()
+                if not model.image_url:
+                    model.image_url = IMAGE_SETTINGS['PLACEHOLDER_URL']
             # 保存文件到指定目录
 
             # upload_folder = 'uploads'
@@ -116,6 +139,54 @@ class ArticleView(AuthView):
 
         return super(ArticleView, self).on_model_change(form, model, is_created)
 
+    # 文章的语言版本变化后，重建 hreflang 使用的语言表，并增量更新网站地图和 llms.txt
+    def after_model_change(self, form, model, is_created):
+        image_load = getattr(form, 'image_load', None)
+        if image_load and image_load.data:
+            try:
+                create_image_job(image_load.data, model.pk, model.image_job_id)
+            except Exception as e:
+                logger.error(f"图片任务创建失败: {model.image_job_id}: {e}")
+                flash(f'图片暂存失败，请重新上传: {e}', 'error')
+        article_languages.invalidate()
+        schedule_sitemap_update()
+        schedule_llms_update()
+        return super(ArticleView, self).after_model_change(form, model, is_created)
+
+    def on_model_delete(self, model):
+        # 删除的文章查不到更新时间，直接标记它所在的分片
+        schedule_sitemap_update(model.lang, model.ids)
+        schedule_llms_update(model.lang)
+        return super(ArticleView, self).on_model_delete(model)
+
+    def after_model_delete(self, model):
+        article_languages.invalidate()
+        return super(ArticleView, self).after_model_delete(model)
+
+
+def _image_job_status(job_id):
+    if not job_id:
+        return ''
+    job = 图片任务db.objects(job_id=job_id).only('status').first()
+    return job.status if job else ''
+
+
+class ImageJobView(AuthView):
+    """图片处理任务（只读，失败或中断的任务可以重新执行）"""
+    can_create = False
+    can_edit = False
+    can_delete = False
+    column_list = ('job_id', 'status', 'filename', 'image_url', 'error', 'attempts', 'created_at', 'finished_at')
+    column_filters = ('status',)
+    column_searchable_list = ('job_id', 'article_id', 'filename')
+    column_default_sort = ('created_at', True)
+
+    @action('retry', '重新执行', '重新执行选中的失败或已中断的任务？')
+    def action_retry(self, ids):
+        jobs = 图片任务db.objects(id__in=ids).only('job_id')
+        count = retry_image_jobs(job.job_id for job in jobs)
+        flash(f'已重新提交 {count} 个任务', 'success')
+
 
 # 标签动态跟随
 # 分类动态跟随
@@ -6,6 +6,7 @@ from wtforms import SelectField, TextAreaField
 from wtforms.validators import DataRequired
 from apps.models.comment_model import 评论db, 评论统计db
 from apps.services.comment_service import CommentService
+from apps.services.spam_sweep import start_spam_sweep
 from datetime import datetime, timedelta
 import pytz
 
@@ -222,13 +223,12 @@ class CommentBatchView(BaseView):
         comment_ids = request.form.getlist('comment_ids')
         moderator = current_user.name if hasattr(current_user, 'name') else 'admin'
         
-        success_count = 0
-        for comment_id in comment_ids:
-            result = CommentService.moderate_comment(comment_id, 'approved', moderator)
-            if result['success']:
-                success_count += 1
+        result = CommentService.bulk_moderate(comment_ids, 'approved', moderator)
         
-        flash(f'成功批准 {success_count} 条评论', 'success')
+        if result['success']:
+            flash(f'成功批准 {result["updated"]} 条评论', 'success')
+        else:
+            flash(f'操作失败: {result["message"]}', 'error')
         return redirect(url_for('commentstatsview.pending_comments'))
     
     @expose('/batch-reject', methods=['POST'])
@@ -237,30 +237,20 @@ class CommentBatchView(BaseView):
         comment_ids = request.form.getlist('comment_ids')
         moderator = current_user.name if hasattr(current_user, 'name') else 'admin'
         
-        success_count = 0
-        for comment_id in comment_ids:
-            result = CommentService.moderate_comment(comment_id, 'rejected', moderator)
-            if result['success']:
-                success_count += 1
+        result = CommentService.bulk_moderate(comment_ids, 'rejected', moderator)
         
-        flash(f'成功拒绝 {success_count} 条评论', 'success')
+        if result['success']:
+            flash(f'成功拒绝 {result["updated"]} 条评论', 'success')
+        else:
+            flash(f'操作失败: {result["message"]}', 'error')
         return redirect(url_for('commentstatsview.pending_comments'))
     
     @expose('/clean-spam', methods=['POST'])
     def clean_spam(self):
-        """清理垃圾评论"""
-        # 获取所有待审核的评论
-        pending_comments = 评论db.objects(status='pending')
-        spam_count = 0
-        
-        for comment in pending_comments:
-            # 使用垃圾检测算法
-            if CommentService._is_spam_comment(comment.content, comment.username):
-                comment.status = 'rejected'
-                comment.moderated_by = 'auto-spam-filter'
-                comment.moderated_at = datetime.now(pytz.timezone('Asia/Shanghai'))
-                comment.save()
-                spam_count += 1
+        """清理垃圾评论（后台任务，进度见 /api/comments/admin/spam-sweep）"""
+        moderator = current_user.name if hasattr(current_user, 'name') else 'admin'
+        job = start_spam_sweep(moderator)
         
-        flash(f'自动清理了 {spam_count} 条垃圾评论', 'success')
-        return redirect(url_for('.index')) 
\ No newline at end of file
+        flash(f'垃圾评论清理任务已在后台运行: {job["job_id"]}（已扫描 {job["scanned"]} 条，'
+              f'已拒绝 {job["rejected"]} 条）', 'success')
+        return redirect(url_for('.index'))
@@ -89,4 +89,26 @@ class 评论统计db(Document):
     last_updated = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))
 
     def __str__(self):
-        return f'{self.article_url} - {self.total_comments} comments' 
\ No newline at end of file
+        return f'{self.article_url} - {self.total_comments} comments' 
+
+
+class 评论清理任务db(Document):
+    """垃圾评论清理任务（后台执行，记录进度检查点）"""
+    meta = {
+        'collection': 'comment_sweep_jobs',
+        'indexes': ['job_id', 'status']
+    }
+    
+    job_id = StringField(required=True, unique=True, default=lambda: str(uuid.uuid4()))
+    status = StringField(choices=['running', 'completed', 'failed'], default='running')
+    scanned = IntField(default=0)  # 已扫描的待审核评论数
+    rejected = IntField(default=0)  # 已拒绝的垃圾评论数
+    last_id = StringField()  # 检查点：最后处理的评论 _id
+    error = StringField()
+    started_by = StringField()
+    started_at = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))
+    updated_at = DateTimeField(default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')))
+    finished_at = DateTimeField()
+
+    def __str__(self):
+        return f'{self.job_id} - {self.status}'
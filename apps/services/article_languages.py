@@ -0,0 +1,78 @@
+"""
+文章语言可用性表
+预先计算每个 article_url 实际存在的语言版本，内容页的 hreflang 只输出这些语言，
+避免爬虫顺着不存在的语言链接走到 404 并产生数据库查询。
+文章在后台增删改时立即重建；其它 worker 的副本按 TTL 过期后重建。
+"""
+
+import threading
+import time
+
+from loguru import logger
+
+from apps.models.article_model import 文章db
+from setting import LANGUAGES
+
+
+class ArticleLanguageMap:
+    """
+    article_url -> 存在的语言代码集合
+    整张表只用一次投影查询构建，查询结果按 setting.LANGUAGES 的顺序返回
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._languages = {}
+        self._built_at = 0.0
+
+    def refresh(self):
+        """重建可用性表"""
+        start_time = time.time()
+        languages = {}
+        cursor = 文章db._get_collection().find({}, projection={'article_url': 1, 'lang': 1, '_id': 0})
+        for doc in cursor:
+            article_url, lang = doc.get('article_url'), doc.get('lang')
+            if article_url and lang:
+                languages.setdefault(article_url, set()).add(lang)
+
+        with self._lock:
+            self._languages = {url: frozenset(codes) for url, codes in languages.items()}
+            self._built_at = time.time()
+        logger.info(f"文章语言表已重建: {len(languages)} 篇文章，耗时 {(time.time() - start_time) * 1000:.1f}ms")
+
+    def invalidate(self):
+        """文章变更后调用，下次访问时重建"""
+        with self._lock:
+            self._built_at = 0.0
+
+    def _ensure_current(self):
+        if time.time() - self._built_at < self.ttl:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # 查询失败时沿用旧表，稍后重试
+            logger.error(f"文章语言表重建失败: {e}")
+            with self._lock:
+                self._built_at = time.time() - self.ttl + 30
+
+    def codes(self, article_url):
+        """文章存在的语言代码，未知文章返回空集合"""
+        self._ensure_current()
+        return self._languages.get(article_url, frozenset())
+
+    def alternates(self, article_url):
+        """
+        hreflang 使用的语言列表（setting.LANGUAGES 中的条目）
+        Args:
+            article_url: 文章自定义url
+        Returns:
+            list: 该文章存在的语言
+        """
+        codes = self.codes(article_url)
+        return [language for language in LANGUAGES if language['code'] in codes]
+
+
+# 全局文章语言表
+article_languages = ArticleLanguageMap()
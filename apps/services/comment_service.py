@@ -6,6 +6,9 @@ from flask import request
 from mongoengine import Q
 from apps.models.comment_model import 评论db, 评论统计db, 回复
 from apps.models.article_model import 文章db
+from apps.services.like_buffer import like_buffer
+from apps.services.rate_limiter import comment_rate_limiter
+from apps.services.spam_filter import spam_filter
 from setting import COMMENT_SETTINGS
 
 
@@ -46,14 +49,11 @@ class CommentService:
                     'message': 'Comment detected as spam'
                 }
             
-            # 3. 频率限制检查
+            # 3. 频率限制检查（只计入通过校验的评论；内存计数，不访问数据库）
             if request_info:
-                rate_limit_result = CommentService._check_rate_limit(request_info.get('ip'))
+                rate_limit_result = CommentService._check_rate_limit(request_info.get('ip'), 'comment')
                 if not rate_limit_result['allowed']:
-                    return {
-                        'success': False,
-                        'message': 'Rate limit exceeded. Please try again later.'
-                    }
+                    return CommentService._rate_limited_result(rate_limit_result)
             
             # 4. 获取文章信息（不再根据语言过滤）
             article = 文章db.objects(article_url=article_url).first()
@@ -141,7 +141,7 @@ class CommentService:
                     'username': comment.username,
                     'content': comment.content,
                     'rating': comment.rating,
-                    'likes': comment.likes,
+                    'likes': comment.likes + like_buffer.pending_comment_likes(comment.comment_id),
                     'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                     'lang': comment.lang or '',  # 显示语言信息，但不影响查询
                     'replies': []
@@ -161,7 +161,7 @@ class CommentService:
                             'reply_id': reply.reply_id,
                             'username': reply.username,
                             'content': reply.content,
-                            'likes': reply.likes,
+                            'likes': reply.likes + like_buffer.pending_reply_likes(comment.comment_id, reply.reply_id),
                             'created_at': reply.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                             'parent_reply_id': reply.parent_reply_id or '',
                             'reply_to_username': reply.reply_to_username or ''
@@ -203,14 +203,6 @@ class CommentService:
             dict: 操作结果
         """
         try:
-            # 查找评论
-            comment = 评论db.objects(comment_id=comment_id).first()
-            if not comment:
-                return {
-                    'success': False,
-                    'message': 'Comment not found'
-                }
-            
             # 验证回复数据 - 使用更严格的验证
             validation_result = CommentService._validate_reply_data(reply_data)
             if not validation_result['valid']:
@@ -230,6 +222,20 @@ class CommentService:
                     'message': 'Reply detected as spam'
                 }
             
+            # 频率限制检查（只计入通过校验的回复）
+            if request_info:
+                rate_limit_result = CommentService._check_rate_limit(request_info.get('ip'), 'reply')
+                if not rate_limit_result['allowed']:
+                    return CommentService._rate_limited_result(rate_limit_result)
+            
+            # 查找评论
+            comment = 评论db.objects(comment_id=comment_id).first()
+            if not comment:
+                return {
+                    'success': False,
+                    'message': 'Comment not found'
+                }
+            
             # 如果是回复其他回复，验证被回复的回复是否存在
             parent_reply_id = reply_data.get('parent_reply_id')
             reply_to_username = reply_data.get('reply_to_username')
@@ -270,28 +276,43 @@ class CommentService:
             }
     
     @staticmethod
-    def like_comment(comment_id):
+    def like_comment(comment_id, request_info=None):
         """
-        点赞评论
+        点赞评论（写入点赞缓冲，由后台批量落库）
         Args:
             comment_id: 评论ID
+            request_info: 请求信息
         Returns:
             dict: 操作结果
         """
         try:
-            comment = 评论db.objects(comment_id=comment_id).first()
+            if request_info:
+                rate_limit_result = CommentService._check_rate_limit(request_info.get('ip'), 'like')
+                if not rate_limit_result['allowed']:
+                    return CommentService._rate_limited_result(rate_limit_result)
+            
+            if not CommentService._is_valid_id(comment_id):
+                return {
+                    'success': False,
+                    'message': 'Comment not found'
+                }
+            
+            # 只读点赞数做存在性检查（按 comment_id 索引，不加载整个评论文档）
+            comment = 评论db._get_collection().find_one(
+                {'comment_id': comment_id}, projection={'_id': 0, 'likes': 1})
             if not comment:
                 return {
                     'success': False,
                     'message': 'Comment not found'
                 }
             
-            comment.update(inc__likes=1)
+            pending = like_buffer.add_comment_like(comment_id)
             
             return {
                 'success': True,
                 'message': 'Comment liked',
-                'likes': comment.likes + 1
+                'likes': (comment.get('likes') or 0) + pending,
+                'pending': pending
             }
             
         except Exception as e:
@@ -301,37 +322,45 @@ class CommentService:
             }
     
     @staticmethod
-    def like_reply(comment_id, reply_id):
+    def like_reply(comment_id, reply_id, request_info=None):
         """
-        点赞回复
+        点赞回复（写入点赞缓冲，由后台批量落库）
         Args:
             comment_id: 评论ID
             reply_id: 回复ID
+            request_info: 请求信息
         Returns:
             dict: 操作结果
         """
         try:
-            comment = 评论db.objects(comment_id=comment_id).first()
-            if not comment:
+            if request_info:
+                rate_limit_result = CommentService._check_rate_limit(request_info.get('ip'), 'like')
+                if not rate_limit_result['allowed']:
+                    return CommentService._rate_limited_result(rate_limit_result)
+            
+            if not CommentService._is_valid_id(comment_id) or not CommentService._is_valid_id(reply_id):
                 return {
                     'success': False,
-                    'message': 'Comment not found'
+                    'message': 'Reply not found'
                 }
             
-            # 查找并更新回复
-            for reply in comment.replies:
-                if reply.reply_id == reply_id:
-                    reply.likes += 1
-                    comment.save()
-                    return {
-                        'success': True,
-                        'message': 'Reply liked',
-                        'likes': reply.likes
-                    }
+            # $elemMatch 投影只取匹配的那条回复
+            comment = 评论db._get_collection().find_one(
+                {'comment_id': comment_id},
+                projection={'_id': 0, 'replies': {'$elemMatch': {'reply_id': reply_id}}})
+            if not comment or not comment.get('replies'):
+                return {
+                    'success': False,
+                    'message': 'Reply not found'
+                }
+            
+            pending = like_buffer.add_reply_like(comment_id, reply_id)
             
             return {
-                'success': False,
-                'message': 'Reply not found'
+                'success': True,
+                'message': 'Reply liked',
+                'likes': (comment['replies'][0].get('likes') or 0) + pending,
+                'pending': pending
             }
             
         except Exception as e:
@@ -417,6 +446,61 @@ class CommentService:
                 'message': f'Error moderating comment: {str(e)}'
             }
     
+    @staticmethod
+    def bulk_moderate(comment_ids, status, moderator):
+        """
+        批量审核评论
+        一次 update_many 修改状态，每篇受影响的文章只重新统计一次
+        Args:
+            comment_ids: 评论ID列表
+            status: 新状态 (approved/rejected)
+            moderator: 审核员
+        Returns:
+            dict: 操作结果
+        """
+        try:
+            comment_ids = list(dict.fromkeys(cid for cid in comment_ids if cid))
+            if not comment_ids:
+                return {
+                    'success': True,
+                    'message': 'No comments to moderate',
+                    'updated': 0,
+                    'articles': 0
+                }
+            
+            # 只取需要变更状态的评论的文章信息
+            changed = 评论db.objects(comment_id__in=comment_ids, status__ne=status).only(
+                'article_url', 'article_id').as_pymongo()
+            affected_articles = {}
+            for doc in changed:
+                affected_articles.setdefault(doc['article_url'], doc.get('article_id'))
+            
+            # 已是目标状态的评论不修改（不刷新审核人和审核时间，也不计入 updated）
+            now = datetime.now(pytz.timezone('Asia/Shanghai'))
+            updated = 评论db.objects(comment_id__in=comment_ids, status__ne=status).update(
+                set__status=status,
+                set__moderated_by=moderator,
+                set__moderated_at=now,
+                set__updated_at=now
+            )
+            
+            # 每篇文章只重新统计一次
+            for article_url, article_id in affected_articles.items():
+                CommentService.update_statistics(article_url, article_id)
+            
+            return {
+                'success': True,
+                'message': f'{updated} comments {status} successfully',
+                'updated': updated,
+                'articles': len(affected_articles)
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error moderating comments: {str(e)}'
+            }
+    
     @staticmethod
     def update_statistics(article_url, article_id):
         """
@@ -550,48 +634,39 @@ class CommentService:
     
     @staticmethod
     def _is_spam_comment(content, username):
-        """垃圾评论检测"""
-        # 如果禁用了垃圾检测，直接返回False
-        if not COMMENT_SETTINGS.get('ENABLE_SPAM_DETECTION', True):
-            return False
-            
-        content_lower = content.lower()
-        username_lower = username.lower()
-        
-        # 检查敏感词（如果启用）
-        if COMMENT_SETTINGS.get('SPAM_KEYWORD_CHECK', True):
-            for keyword in CommentService.SPAM_KEYWORDS:
-                if keyword.lower() in content_lower or keyword.lower() in username_lower:
-                    return True
-        
-        # 检查重复字符（使用配置的阈值）
-        char_repeat_threshold = COMMENT_SETTINGS.get('SPAM_CHAR_REPEAT_THRESHOLD', 0.3)
-        if len(content) > 0 and len(set(content)) / len(content) < char_repeat_threshold:
-            return True
-        
-        return False
+        """垃圾评论检测（关键词自动机 + 打分流水线，见 spam_filter）"""
+        return spam_filter.is_spam(content, username)
     
     @staticmethod
-    def _check_rate_limit(ip_address):
-        """频率限制检查"""
+    def _check_rate_limit(ip_address, action='comment'):
+        """频率限制检查（共享内存滑动窗口，阈值见 COMMENT_SETTINGS['RATE_LIMIT']）"""
         if not ip_address:
             return {'allowed': True}
         
-        # 简单的频率限制：每IP每分钟最多5条评论
         try:
-            one_minute_ago = datetime.now(pytz.timezone('Asia/Shanghai')) - timedelta(minutes=1)
-            recent_comments = 评论db.objects(
-                user_ip=ip_address,
-                created_at__gte=one_minute_ago
-            ).count()
-            
-            return {
-                'allowed': recent_comments < 5,
-                'remaining': max(0, 5 - recent_comments)
-            }
-        except:
+            return comment_rate_limiter.check(action, ip_address)
+        except Exception:
             return {'allowed': True}
     
+    @staticmethod
+    def _rate_limited_result(rate_limit_result):
+        """频率超限时的统一返回"""
+        return {
+            'success': False,
+            'rate_limited': True,
+            'retry_after': rate_limit_result.get('retry_after', 0),
+            'message': 'Rate limit exceeded. Please try again later.'
+        }
+    
+    @staticmethod
+    def _is_valid_id(value):
+        """检查是否为合法的UUID（评论和回复ID均由uuid4生成）"""
+        try:
+            uuid.UUID(str(value))
+            return True
+        except ValueError:
+            return False
+    
     @staticmethod
     def _sanitize_content(content):
         """内容清理"""
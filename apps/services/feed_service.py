@@ -0,0 +1,150 @@
+"""
+RSS 订阅源
+/feed.xml、/<语言>/feed.xml 使用与首页相同的文章卡片数据（get_cached_article_list，
+按发布时间倒序，只取已发布的文章，与网站地图一致），每种语言只在卡片列表变化时序列化一次，结果连同 gzip 版本和 ETag
+缓存为字节串；轮询请求只做一次指纹比较，内容没变时返回 304。
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from flask import current_app, request
+from loguru import logger
+
+from incremental import HOST, page_url, to_utc
+from setting import FEED_SETTINGS, LANGUAGES
+
+LANGUAGE_NAMES = {language['code']: language['name'] for language in LANGUAGES}
+
+
+class _Feed:
+    __slots__ = ('source', 'fingerprint', 'data', 'gzip_data', 'etag', 'last_modified')
+
+
+def build_rss(lang, articles):
+    """
+    卡片列表 -> RSS 2.0
+    Args:
+        lang: 语言代码
+        articles: get_cached_article_list 返回的卡片（url、title、image、desc、date）
+    Returns:
+        tuple: (xml 字节串, 最新发布时间)
+    """
+    home = page_url(lang)
+    self_url = f'{HOST}feed.xml' if lang == 'en' else f'{HOST}{lang}/feed.xml'
+    dates = [to_utc(article['date']) for article in articles if article.get('date')]
+    last_modified = max(dates) if dates else None
+
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">\n'
+        '<channel>\n',
+        f'  <title>{escape(FEED_SETTINGS["TITLE"])} ({escape(LANGUAGE_NAMES.get(lang, lang))})</title>\n',
+        f'  <link>{escape(home)}</link>\n',
+        f'  <description>{escape(FEED_SETTINGS["DESCRIPTION"])}</description>\n',
+        f'  <language>{escape(lang)}</language>\n',
+        f'  <atom:link href="{escape(self_url)}" rel="self" type="application/rss+xml"/>\n',
+        f'  <ttl>{FEED_SETTINGS["MAX_AGE"] // 60}</ttl>\n',
+    ]
+    if last_modified:
+        parts.append(f'  <lastBuildDate>{format_datetime(last_modified)}</lastBuildDate>\n')
+    for article in articles:
+        if not article.get('url'):
+            continue
+        link = escape(page_url(lang, article['url']))
+        parts.append('  <item>\n')
+        parts.append(f'    <title>{escape(article.get("title") or article["url"])}</title>\n')
+        parts.append(f'    <link>{link}</link>\n')
+        parts.append(f'    <guid isPermaLink="true">{link}</guid>\n')
+        if article.get('desc'):
+            parts.append(f'    <description>{escape(article["desc"])}</description>\n')
+        if article.get('date'):
+            parts.append(f'    <pubDate>{format_datetime(to_utc(article["date"]))}</pubDate>\n')
+        if article.get('image'):
+            parts.append(f'    <media:thumbnail url="{escape(article["image"])}"/>\n')
+        parts.append('  </item>\n')
+    parts.append('</channel>\n</rss>\n')
+    return ''.join(parts).encode('utf-8'), last_modified
+
+
+class FeedCache:
+    """
+    按语言缓存序列化好的订阅源
+    - 卡片列表还是同一个对象（TTLCache 未过期）时直接命中
+    - 列表重新查询过时先比较内容指纹，内容没变则沿用原字节串和 ETag
+    """
+
+    def __init__(self, max_age=600):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._stats = {'requests': 0, 'hits': 0, 'rebuilds': 0, 'not_modified': 0, 'last_build_ms': 0.0}
+
+    @staticmethod
+    def _fingerprint(articles):
+        return tuple((article.get('url'), article.get('title'), article.get('desc'),
+                      article.get('image'), article.get('date')) for article in articles)
+
+    def get(self, lang, articles):
+        """
+        获取语言的订阅源缓存，卡片变化时重新序列化
+        Returns:
+            _Feed
+        """
+        feed = self._feeds.get(lang)
+        if feed is not None and feed.source is articles:
+            self._stats['hits'] += 1
+            return feed
+
+        fingerprint = self._fingerprint(articles)
+        if feed is not None and feed.fingerprint == fingerprint:
+            feed.source = articles
+            self._stats['hits'] += 1
+            return feed
+
+        start_time = time.time()
+        data, last_modified = build_rss(lang, articles)
+        feed = _Feed()
+        feed.source = articles
+        feed.fingerprint = fingerprint
+        feed.data = data
+        feed.gzip_data = gzip.compress(data, mtime=0)
+        feed.etag = hashlib.md5(data).hexdigest()[:16]
+        feed.last_modified = last_modified
+        with self._lock:
+            self._feeds[lang] = feed
+        self._stats['rebuilds'] += 1
+        self._stats['last_build_ms'] = round((time.time() - start_time) * 1000, 2)
+        logger.info(f"订阅源已生成: {lang}，{len(articles)} 条，{len(data)} 字节")
+        return feed
+
+    def response(self, lang, articles):
+        """生成订阅源响应（条件请求、gzip）"""
+        self._stats['requests'] += 1
+        feed = self.get(lang, articles)
+        use_gzip = bool(request.accept_encodings['gzip'])
+        response = current_app.response_class(feed.gzip_data if use_gzip else feed.data,
+                                              mimetype='application/rss+xml')
+        response.set_etag(feed.etag + ('-gz' if use_gzip else ''))
+        if feed.last_modified:
+            response.last_modified = feed.last_modified
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self._stats['not_modified'] += 1
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response
+
+    def get_stats(self):
+        return {**self._stats, 'languages': sorted(self._feeds)}
+
+
+# 全局订阅源缓存
+feed_cache = FeedCache(max_age=FEED_SETTINGS['MAX_AGE'])
@@ -0,0 +1,232 @@
+"""
+文章图片后台处理队列
+后台保存文章时文章先以占位图保存，保存成功后才把上传的原图暂存到磁盘并登记任务（图片任务db），
+任务总是带着文章 ID；解码、缩放、编码和上传在本进程的线程池中执行，完成后回写文章的 image_url / image_variants。
+- 回写条件带上 image_job_id，处理期间文章又换了图片时，旧任务的结果不会覆盖新图片
+- 任务状态在后台「图片任务」中查看，失败的任务可以手动重新执行
+- 线程池在各 worker 进程内，worker 被回收（max_requests）或重启时未完成的任务会中断；
+  每个进程的检查线程每隔 JOB_SWEEP_INTERVAL 秒把超过 JOB_STALE_SECONDS 未更新的任务重新排队，
+  认领用带 status / updated_at 条件的 update_one，多个 worker 同时检查时每个任务只会被一个认领
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytz
+from bson import ObjectId
+from loguru import logger
+
+from apps.models.article_model import 图片任务db, 文章db
+from setting import IMAGE_SETTINGS
+from tool.mpuscript import process_image
+
+SPOOL_DIR = IMAGE_SETTINGS['JOB_SPOOL_DIR']
+STALE_AFTER = timedelta(seconds=IMAGE_SETTINGS['JOB_STALE_SECONDS'])
+SWEEP_INTERVAL = IMAGE_SETTINGS['JOB_SWEEP_INTERVAL']
+
+_executor = None
+_executor_lock = threading.Lock()
+_sweeper_pid = None
+
+
+def _now():
+    return datetime.now(pytz.timezone('Asia/Shanghai'))
+
+
+def _format_time(value):
+    # 从数据库读回的是不带时区的 UTC 时间，统一按上海时间输出
+    if not value:
+        return ''
+    if value.tzinfo is None:
+        value = pytz.utc.localize(value)
+    return value.astimezone(pytz.timezone('Asia/Shanghai')).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _get_executor():
+    # 线程池在第一次提交任务时创建（gunicorn preload 下不会在 fork 前启动线程）
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_SETTINGS['JOB_WORKERS'], thread_name_prefix='image-job')
+    start_image_job_sweeper()
+    return _executor
+
+
+def _claim(job, now=None):
+    """
+    把任务重新置为 queued：条件带上读取时的 status 和 updated_at，
+    其它进程已经认领或任务已被更新时不会生效
+    Returns:
+        bool: 是否认领成功
+    """
+    return bool(图片任务db.objects(job_id=job.job_id, status=job.status, updated_at=job.updated_at).update_one(
+        set__status='queued', set__updated_at=now or _now()))
+
+
+def _job_to_dict(job):
+    return {
+        'job_id': job.job_id,
+        'article_id': job.article_id or '',
+        'status': job.status,
+        'filename': job.filename or '',
+        'image_url': job.image_url or '',
+        'error': job.error or '',
+        'attempts': job.attempts,
+        'created_at': _format_time(job.created_at),
+        'updated_at': _format_time(job.updated_at),
+        'finished_at': _format_time(job.finished_at)
+    }
+
+
+def new_job_id():
+    """文章保存前先生成任务ID写入 image_job_id，保存成功后再用它创建任务"""
+    return str(uuid.uuid4())
+
+
+def create_image_job(file, article_id, job_id=None):
+    """
+    文章保存后调用：暂存上传的图片、登记任务并提交（请求内只做一次磁盘复制）
+    Args:
+        file: 上传的文件对象（FileStorage 或可读的二进制流）
+        article_id: 文章ID
+        job_id: 任务ID（文章的 image_job_id），为空时自动生成
+    Returns:
+        图片任务db: 已提交的任务
+    """
+    job = 图片任务db(job_id=job_id or new_job_id(), article_id=str(article_id),
+                 filename=getattr(file, 'filename', '') or '')
+    job.source_path = os.path.join(SPOOL_DIR, job.job_id)
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    stream = getattr(file, 'stream', file)
+    # 表单的 ImageUploadField 已经读过一遍文件
+    stream.seek(0)
+    with open(job.source_path, 'wb') as f:
+        shutil.copyfileobj(stream, f)
+    job.save()
+    _get_executor().submit(run_image_job, job.job_id)
+    return job
+
+
+def run_image_job(job_id):
+    """
+    执行任务（阻塞，在线程池中调用）
+    Args:
+        job_id: 任务ID
+    """
+    job = 图片任务db.objects(job_id=job_id).first()
+    if job is None:
+        return
+    job.status = 'running'
+    job.attempts += 1
+    job.error = None
+    job.updated_at = _now()
+    job.save()
+
+    try:
+        with open(job.source_path, 'rb') as f:
+            manifest = process_image(f)
+        patched = 文章db.objects(pk=ObjectId(job.article_id), image_job_id=job.job_id).update(
+            set__image_url=manifest['src'],
+            set__image_variants=manifest,
+            set__更新时间=_now()
+        )
+        job.status = 'completed'
+        job.image_url = manifest['src']
+        job.finished_at = _now()
+        job.updated_at = job.finished_at
+        job.save()
+        os.remove(job.source_path)
+        if patched:
+            logger.info(f"图片处理完成: {job.job_id} -> {manifest['src']}")
+        else:
+            logger.info(f"图片处理完成，文章已换图或已删除，不回写: {job.job_id}")
+    except Exception as e:
+        job.status = 'failed'
+        job.error = f"{type(e).__name__}: {e}"
+        job.updated_at = _now()
+        job.save()
+        logger.error(f"图片处理失败: {job.job_id}: {job.error}")
+
+
+def _is_stale(job, now):
+    updated_at = job.updated_at
+    if updated_at and updated_at.tzinfo is None:
+        updated_at = pytz.utc.localize(updated_at)
+    return job.status in ('queued', 'running') and updated_at and now - updated_at >= STALE_AFTER
+
+
+def retry_image_jobs(job_ids):
+    """
+    重新执行失败或已中断的任务
+    Returns:
+        int: 重新提交的任务数
+    """
+    count = 0
+    now = _now()
+    for job in 图片任务db.objects(job_id__in=list(job_ids)):
+        if not job.article_id or not (job.status == 'failed' or _is_stale(job, now)):
+            continue
+        if not os.path.exists(job.source_path or ''):
+            continue
+        if _claim(job, now):
+            _get_executor().submit(run_image_job, job.job_id)
+            count += 1
+    return count
+
+
+def resume_image_jobs():
+    """
+    重新提交已中断的任务（queued / running 且超过 STALE_AFTER 未更新）
+    原图已不存在的任务标记为失败，之后不再检查
+    Returns:
+        int: 重新提交的任务数
+    """
+    count = 0
+    now = _now()
+    jobs = 图片任务db.objects(status__in=['queued', 'running'], article_id__ne=None, updated_at__lt=now - STALE_AFTER)
+    for job in jobs:
+        if not os.path.exists(job.source_path or ''):
+            图片任务db.objects(job_id=job.job_id, status=job.status, updated_at=job.updated_at).update_one(
+                set__status='failed', set__error='原图已不存在', set__updated_at=now)
+            continue
+        if _claim(job, now):
+            _get_executor().submit(run_image_job, job.job_id)
+            count += 1
+    if count:
+        logger.info(f"已重新提交 {count} 个中断的图片任务")
+    return count
+
+
+def _sweep_worker():
+    while True:
+        try:
+            resume_image_jobs()
+        except Exception as e:
+            logger.error(f"检查中断的图片任务失败: {e}")
+        time.sleep(SWEEP_INTERVAL)
+
+
+def start_image_job_sweeper():
+    """每个进程启动一次检查线程（preload_app 下 fork 前的线程不会被继承，由 gunicorn post_fork 调用）"""
+    global _sweeper_pid
+    with _executor_lock:
+        if _sweeper_pid == os.getpid():
+            return
+        _sweeper_pid = os.getpid()
+    threading.Thread(target=_sweep_worker, daemon=True, name='image-job-sweeper').start()
+    logger.info(f"图片任务检查线程已启动 (pid={_sweeper_pid})")
+
+
+def get_image_job(job_id):
+    """
+    查询任务状态
+    Returns:
+        dict: 任务信息，不存在时返回 None
+    """
+    job = 图片任务db.objects(job_id=job_id).first()
+    return _job_to_dict(job) if job else None
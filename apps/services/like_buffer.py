@@ -0,0 +1,178 @@
+"""
+点赞写缓冲（write-behind）
+点赞请求只在内存中累加计数并立即返回，后台线程定期把同一评论/回复的增量合并成
+一次 bulk_write $inc 写入数据库；worker 退出时再刷新一次，避免丢失计数。
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from apps.models.comment_model import 评论db
+from setting import COMMENT_SETTINGS
+
+# 保护各进程首次使用时的状态重置和刷新线程启动（只会在 worker 中持有，不会在 fork 时被占用）
+_worker_lock = threading.Lock()
+
+
+class LikeBuffer:
+    """
+    点赞计数缓冲
+    特点：
+    - 按评论ID / (评论ID, 回复ID) 合并增量
+    - 定时或积压过多时批量刷新
+    - 刷新失败的增量放回缓冲，下次重试
+    - 记录缓冲深度、刷新耗时等指标
+    """
+
+    def __init__(self, flush_interval=2, max_keys=10000):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self._pid = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._comments = {}
+        self._replies = {}
+        self._stats = {
+            'queued': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'last_flush_at': None
+        }
+
+    def _ensure_worker(self):
+        """每个进程首次使用时启动刷新线程（preload_app 下 fork 前的线程不会被继承）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with _worker_lock:
+            if self._pid == pid:
+                return
+            self._lock = threading.Lock()
+            self._flush_lock = threading.Lock()
+            self._wakeup = threading.Event()
+            self._comments = {}
+            self._replies = {}
+            thread = threading.Thread(target=self._flush_worker, daemon=True)
+            thread.start()
+            # 状态重置完成后才记录 pid，其它线程在此之前都会等待上面的锁
+            self._pid = pid
+        logger.info(f"点赞缓冲刷新线程已启动 (pid={pid})")
+
+    def _flush_worker(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"点赞缓冲刷新失败: {e}")
+
+    def add_comment_like(self, comment_id, count=1):
+        """累加评论点赞，返回该评论在缓冲中的待写入增量"""
+        self._ensure_worker()
+        with self._lock:
+            pending = self._comments.get(comment_id, 0) + count
+            self._comments[comment_id] = pending
+            self._stats['queued'] += count
+            depth = len(self._comments) + len(self._replies)
+        if depth >= self.max_keys:
+            self._wakeup.set()
+        return pending
+
+    def add_reply_like(self, comment_id, reply_id, count=1):
+        """累加回复点赞，返回该回复在缓冲中的待写入增量"""
+        self._ensure_worker()
+        key = (comment_id, reply_id)
+        with self._lock:
+            pending = self._replies.get(key, 0) + count
+            self._replies[key] = pending
+            self._stats['queued'] += count
+            depth = len(self._comments) + len(self._replies)
+        if depth >= self.max_keys:
+            self._wakeup.set()
+        return pending
+
+    def pending_comment_likes(self, comment_id):
+        """本进程中尚未写入的评论点赞数"""
+        return self._comments.get(comment_id, 0)
+
+    def pending_reply_likes(self, comment_id, reply_id):
+        """本进程中尚未写入的回复点赞数"""
+        return self._replies.get((comment_id, reply_id), 0)
+
+    def flush(self):
+        """
+        把缓冲中的增量批量写入数据库
+        Returns:
+            int: 本次写入的点赞总数
+        """
+        with self._flush_lock:
+            with self._lock:
+                comments, self._comments = self._comments, {}
+                replies, self._replies = self._replies, {}
+            if not comments and not replies:
+                return 0
+
+            operations = [
+                UpdateOne({'comment_id': comment_id}, {'$inc': {'likes': count}})
+                for comment_id, count in comments.items()
+            ]
+            operations.extend(
+                UpdateOne({'comment_id': comment_id, 'replies.reply_id': reply_id},
+                          {'$inc': {'replies.$.likes': count}})
+                for (comment_id, reply_id), count in replies.items()
+            )
+            total = sum(comments.values()) + sum(replies.values())
+
+            start_time = time.time()
+            try:
+                评论db._get_collection().bulk_write(operations, ordered=False)
+            except Exception as e:
+                # 写入失败：把增量放回缓冲，等待下次刷新
+                with self._lock:
+                    for comment_id, count in comments.items():
+                        self._comments[comment_id] = self._comments.get(comment_id, 0) + count
+                    for key, count in replies.items():
+                        self._replies[key] = self._replies.get(key, 0) + count
+                    self._stats['errors'] += 1
+                logger.error(f"点赞批量写入失败，{total} 个点赞将重试: {e}")
+                return 0
+
+            elapsed = (time.time() - start_time) * 1000
+            with self._lock:
+                self._stats['flushed'] += total
+                self._stats['flushes'] += 1
+                self._stats['last_flush_ms'] = round(elapsed, 2)
+                self._stats['max_flush_ms'] = round(max(self._stats['max_flush_ms'], elapsed), 2)
+                self._stats['last_flush_at'] = time.time()
+            logger.debug(f"点赞缓冲刷新: {len(operations)} 条写操作，{total} 个点赞，耗时 {elapsed:.2f}ms")
+            return total
+
+    def get_stats(self):
+        """获取缓冲指标"""
+        with self._lock:
+            return {
+                'pid': self._pid,
+                'depth': len(self._comments) + len(self._replies),
+                'pending_likes': sum(self._comments.values()) + sum(self._replies.values()),
+                **self._stats
+            }
+
+
+# 全局点赞缓冲实例
+like_buffer = LikeBuffer(
+    flush_interval=COMMENT_SETTINGS.get('LIKE_FLUSH_INTERVAL', 2),
+    max_keys=COMMENT_SETTINGS.get('LIKE_BUFFER_MAX_KEYS', 10000)
+)
+
+# 进程正常退出时刷新剩余点赞（gunicorn 的 worker_exit 钩子也会调用）
+atexit.register(like_buffer.flush)
@@ -0,0 +1,35 @@
+"""
+llms.txt 服务
+/llms.txt、/llms-full.txt 的内容由 llms.py 生成在 static/ 下，由 static_files 缓存在内存并处理
+ETag / Last-Modified 条件请求和 gzip 直通；刷新方式与网站地图相同（按间隔在后台增量更新）。
+"""
+
+import os
+
+from loguru import logger
+
+from apps.services.sitemap_service import SitemapService
+from llms import OUTPUTS, update_llms
+from setting import LLMS_SETTINGS
+
+
+class LlmsService(SitemapService):
+    """llms.txt / llms-full.txt 的惰性刷新和响应"""
+
+    def _ready(self):
+        return all(os.path.exists(path) for path in OUTPUTS.values())
+
+    def _update(self):
+        langs = update_llms()
+        if langs:
+            logger.info(f"📝 llms.txt 已刷新: {len(langs)} 种语言")
+
+    def serve_file(self, name):
+        return self.serve(self._static_name(OUTPUTS[name]))
+
+
+# 全局 llms.txt 服务
+llms_service = LlmsService(
+    check_interval=LLMS_SETTINGS['CHECK_INTERVAL'],
+    max_age=LLMS_SETTINGS['MAX_AGE']
+)
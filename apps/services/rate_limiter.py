@@ -0,0 +1,158 @@
+"""
+评论频率限制器
+基于滑动窗口计数器，计数保存在匿名共享内存中：
+gunicorn 使用 preload_app，模块在 master 进程中导入，fork 出的所有 worker 共用同一块内存，
+因此限流在进程间生效，且判断过程不访问数据库。
+"""
+
+import mmap
+import multiprocessing
+import re
+import struct
+import time
+import zlib
+
+from loguru import logger
+
+from setting import COMMENT_SETTINGS
+
+# 槽位结构: key哈希(int64) + 窗口编号(int64) + 当前窗口计数(int32) + 上一窗口计数(int32)
+_SLOT = struct.Struct('qqii')
+# 哈希冲突时最多探测的槽位数
+_MAX_PROBE = 8
+
+_PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+
+def parse_rate(rate):
+    """
+    解析频率字符串
+    Args:
+        rate: 形如 '10/minute'、'5/second'、'100/hour' 的字符串
+    Returns:
+        tuple: (允许次数, 窗口秒数)
+    """
+    match = re.match(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$', str(rate))
+    if not match:
+        raise ValueError(f'Invalid rate limit: {rate}')
+    limit = int(match.group(1))
+    multiplier = int(match.group(2) or 1)
+    return limit, multiplier * _PERIODS[match.group(3)]
+
+
+class SlidingWindowRateLimiter:
+    """
+    滑动窗口限流器
+    特点：
+    - 固定大小的开放寻址哈希表，内存占用恒定
+    - 计数存放在 MAP_SHARED 匿名内存中，fork 后各 worker 共享
+    - 使用上一窗口计数按时间加权估算，避免固定窗口边界突发
+    """
+
+    def __init__(self, rate, slots=4096):
+        self.limit, self.period = parse_rate(rate)
+        self.slots = slots
+        self._buffer = mmap.mmap(-1, _SLOT.size * slots)
+        self._lock = multiprocessing.Lock()
+
+    def _hash(self, key):
+        # crc32 在各进程间稳定（内置 hash 受 PYTHONHASHSEED 影响），0 保留表示空槽
+        return zlib.crc32(key.encode('utf-8')) or 1
+
+    def _find_slot(self, key_hash, window):
+        """查找 key 所在槽位；找不到时返回空槽或最旧的槽位"""
+        start = key_hash % self.slots
+        free = None
+        victim, victim_window = start, None
+        for i in range(_MAX_PROBE):
+            index = (start + i) % self.slots
+            slot_hash, slot_window, curr, prev = _SLOT.unpack_from(self._buffer, index * _SLOT.size)
+            if slot_hash == key_hash:
+                return index, slot_window, curr, prev
+            if free is None and (slot_hash == 0 or slot_window < window - 1):
+                # 空槽或已过期（两个窗口以前）的槽位可直接复用
+                free = index
+            if victim_window is None or slot_window < victim_window:
+                victim, victim_window = index, slot_window
+        return (free if free is not None else victim), 0, 0, 0
+
+    def hit(self, key, cost=1):
+        """
+        记录一次请求并判断是否放行
+        Args:
+            key: 限流键（如 'comment:1.2.3.4'）
+            cost: 本次请求消耗的次数
+        Returns:
+            dict: {'allowed': bool, 'remaining': int, 'retry_after': int}
+        """
+        now = time.time()
+        window = int(now // self.period)
+        elapsed = (now % self.period) / self.period
+        key_hash = self._hash(key)
+
+        with self._lock:
+            index, slot_window, curr, prev = self._find_slot(key_hash, window)
+            if slot_window != window:
+                # 进入新窗口：如果是紧邻的上一窗口则保留其计数用于加权
+                prev = curr if slot_window == window - 1 else 0
+                curr = 0
+
+            estimated = prev * (1 - elapsed) + curr
+            allowed = estimated + cost <= self.limit
+            if allowed:
+                curr += cost
+                estimated += cost
+            _SLOT.pack_into(self._buffer, index * _SLOT.size, key_hash, window, curr, prev)
+
+        return {
+            'allowed': allowed,
+            'remaining': max(0, int(self.limit - estimated)),
+            'retry_after': 0 if allowed else int(self.period * (1 - elapsed)) + 1
+        }
+
+    def reset(self):
+        """清空所有计数"""
+        with self._lock:
+            self._buffer.seek(0)
+            self._buffer.write(b'\x00' * len(self._buffer))
+            self._buffer.seek(0)
+
+
+class CommentRateLimiter:
+    """评论系统限流器：评论、回复、点赞各自独立计数"""
+
+    def __init__(self, settings):
+        default_rate = settings.get('RATE_LIMIT', '10/minute')
+        slots = settings.get('RATE_LIMIT_SLOTS', 4096)
+        self._limiters = {
+            'comment': SlidingWindowRateLimiter(default_rate, slots),
+            'reply': SlidingWindowRateLimiter(settings.get('REPLY_RATE_LIMIT', default_rate), slots),
+            'like': SlidingWindowRateLimiter(settings.get('LIKE_RATE_LIMIT', '60/minute'), slots),
+        }
+        logger.info(f"评论限流器已初始化: {default_rate}")
+
+    def check(self, action, ip_address):
+        """
+        检查某个IP的某类操作是否超限
+        Args:
+            action: comment / reply / like
+            ip_address: 客户端IP
+        Returns:
+            dict: {'allowed': bool, 'remaining': int, 'retry_after': int}
+        """
+        if not ip_address:
+            return {'allowed': True}
+        return self._limiters[action].hit(f'{action}:{ip_address}')
+
+    def reset(self):
+        for limiter in self._limiters.values():
+            limiter.reset()
+
+
+# 全局限流器实例（需在 fork 前创建，以便 worker 共享计数）
+comment_rate_limiter = CommentRateLimiter(COMMENT_SETTINGS)
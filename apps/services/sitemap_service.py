@@ -0,0 +1,105 @@
+"""
+网站地图服务
+/sitemap.xml、/sitemap_index.xml 返回分片索引，/sitemaps/<分片> 返回 gzip 分片，内容都来自
+sitemap.py 生成在磁盘上的文件，由 static_assets.static_files 缓存在内存并处理 ETag / Last-Modified
+条件请求和 gzip 直通（分片本身就是 .xml.gz，索引带同 mtime 的 .gz 副本）。
+请求只触发检查：距上次检查超过 check_interval 秒时，后台线程做一次增量更新
+（只查询水位线之后变化的文章），请求本身不等待也不访问数据库。
+"""
+
+import os
+import threading
+import time
+
+from loguru import logger
+
+from setting import SITEMAP_SETTINGS
+from sitemap import INDEX_PATH, OUTPUT_DIR, update_sitemaps
+from static_assets import static_files
+
+
+class SitemapService:
+    """
+    网站地图的惰性刷新和响应
+    - 索引不存在时（首次部署）同步生成一次，之后只在后台增量更新
+    - 同一进程内同时最多一个刷新线程，跨进程由 sitemap.py 的文件锁串行化
+    """
+
+    def __init__(self, check_interval=300, max_age=3600):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._stats = {'requests': 0, 'refreshes': 0, 'errors': 0, 'last_refresh_ms': 0.0}
+
+    def _static_name(self, path):
+        """磁盘路径 -> static 端点使用的文件名"""
+        return os.path.relpath(os.path.abspath(path), static_files.static_folder).replace(os.sep, '/')
+
+    def _ready(self):
+        """生成的文件是否已存在"""
+        return os.path.exists(INDEX_PATH)
+
+    def _update(self):
+        rewritten = update_sitemaps()
+        if rewritten:
+            logger.info(f"🗺️ 网站地图已刷新: {len(rewritten)} 个分片")
+
+    def _refresh(self):
+        start_time = time.time()
+        try:
+            self._update()
+            self._stats['refreshes'] += 1
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"{type(self).__name__} 刷新失败: {e}")
+        finally:
+            self._stats['last_refresh_ms'] = round((time.time() - start_time) * 1000, 2)
+            with self._lock:
+                self._refreshing = False
+
+    def ensure_fresh(self):
+        """按间隔在后台触发增量更新"""
+        if not self._ready():
+            with self._lock:
+                self._refreshing = True
+                self._checked_at = time.time()
+            self._refresh()
+            return
+
+        now = time.time()
+        with self._lock:
+            if self._refreshing or now - self._checked_at < self.check_interval:
+                return
+            self._refreshing = True
+            self._checked_at = now
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def serve(self, filename):
+        self._stats['requests'] += 1
+        self.ensure_fresh()
+        response = static_files.serve(filename)
+        response.cache_control.max_age = self.max_age
+        return response
+
+    def serve_index(self):
+        return self.serve(self._static_name(INDEX_PATH))
+
+    def serve_shard(self, name):
+        return self.serve(f'{self._static_name(OUTPUT_DIR)}/{name}')
+
+    def get_stats(self):
+        return {
+            **self._stats,
+            'check_interval': self.check_interval,
+            'last_check_at': self._checked_at,
+            'refreshing': self._refreshing
+        }
+
+
+# 全局网站地图服务
+sitemap_service = SitemapService(
+    check_interval=SITEMAP_SETTINGS['CHECK_INTERVAL'],
+    max_age=SITEMAP_SETTINGS['MAX_AGE']
+)
@@ -0,0 +1,167 @@
+"""
+垃圾评论检测
+- KeywordAutomaton: Aho–Corasick 多模式匹配，一次扫描匹配全部敏感词
+- SpamFilter: 可插拔的打分流水线，关键词、重复字符等信号各自作为一个打分器
+"""
+
+import time
+from collections import deque
+
+from loguru import logger
+
+from setting import COMMENT_SETTINGS
+
+
+class KeywordAutomaton:
+    """
+    Aho–Corasick 自动机
+    构建一次 O(关键词总长度)，匹配 O(文本长度)，与关键词数量无关
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]      # 每个节点的转移表
+        self._fail = [0]       # 失败指针
+        self._output = [()]    # 以该节点结尾的关键词（含失败链上的）
+        self.size = 0
+        for keyword in keywords:
+            self._add(keyword.lower())
+        self._build_fail_links()
+
+    def _add(self, keyword):
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        if not self._output[node]:
+            self._output[node] = (keyword,)
+            self.size += 1
+
+    def _build_fail_links(self):
+        """BFS 构建失败指针，并把失败链上的输出合并到当前节点"""
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if node else 0
+                self._output[child] += self._output[self._fail[child]]
+
+    def _scan(self, text):
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            yield from output[node]
+
+    def search(self, text):
+        """返回第一个命中的关键词，没有命中返回 None"""
+        return next(self._scan(text), None)
+
+    def findall(self, text):
+        """返回所有命中的关键词（去重）"""
+        return set(self._scan(text))
+
+
+def keyword_scorer(spam_filter, content, username):
+    """敏感词打分：内容或用户名命中任意关键词记 1 分"""
+    if not COMMENT_SETTINGS.get('SPAM_KEYWORD_CHECK', True):
+        return 0.0
+    automaton = spam_filter.automaton
+    if automaton.search(content) or automaton.search(username):
+        return 1.0
+    return 0.0
+
+
+def repeat_char_scorer(spam_filter, content, username):
+    """重复字符打分：不同字符占比低于阈值记 1 分"""
+    threshold = COMMENT_SETTINGS.get('SPAM_CHAR_REPEAT_THRESHOLD', 0.3)
+    if len(content) > 0 and len(set(content)) / len(content) < threshold:
+        return 1.0
+    return 0.0
+
+
+class SpamFilter:
+    """
+    垃圾评论打分流水线
+    每个打分器返回 0~1 的分数，按权重累加，总分达到 threshold 判定为垃圾评论。
+    关键词自动机按 COMMENT_SETTINGS['SPAM_KEYWORDS'] 构建；修改关键词后调用 reload() 重建，
+    打分时不再检查关键词列表（与关键词数量无关）。
+    """
+
+    def __init__(self, settings, threshold=1.0):
+        self.settings = settings
+        self.threshold = threshold
+        self.automaton = None
+        self._scorers = []
+        self.reload()
+
+    def reload(self, keywords=None):
+        """
+        重建自动机（修改关键词后调用）
+        Args:
+            keywords: 改用这组关键词（不修改配置）；不传时使用配置中的关键词
+        """
+        if keywords is None:
+            keywords = self.settings.get('SPAM_KEYWORDS', [])
+        start_time = time.time()
+        self.automaton = KeywordAutomaton(keywords)
+        logger.debug(f"敏感词自动机已构建: {self.automaton.size} 个关键词，"
+                     f"耗时 {(time.time() - start_time) * 1000:.1f}ms")
+
+    def register_scorer(self, name, scorer, weight=1.0):
+        """
+        注册打分器
+        Args:
+            name: 打分器名称
+            scorer: callable(spam_filter, content, username) -> float
+            weight: 权重
+        """
+        self._scorers = [s for s in self._scorers if s[0] != name]
+        self._scorers.append((name, scorer, weight))
+
+    def unregister_scorer(self, name):
+        self._scorers = [s for s in self._scorers if s[0] != name]
+
+    def score(self, content, username=''):
+        """
+        计算垃圾评分
+        Returns:
+            tuple: (总分, {打分器名称: 分数})
+        """
+        total = 0.0
+        details = {}
+        for name, scorer, weight in self._scorers:
+            value = scorer(self, content, username or '')
+            details[name] = value
+            total += value * weight
+            if total >= self.threshold:
+                # 已达到阈值，后续打分器不影响结论
+                break
+        return total, details
+
+    def is_spam(self, content, username=''):
+        """判断是否为垃圾评论"""
+        if not self.settings.get('ENABLE_SPAM_DETECTION', True):
+            return False
+        total, _ = self.score(content, username)
+        return total >= self.threshold
+
+
+# 全局垃圾评论过滤器
+spam_filter = SpamFilter(COMMENT_SETTINGS)
+spam_filter.register_scorer('keywords', keyword_scorer)
+spam_filter.register_scorer('repeat_chars', repeat_char_scorer)
+
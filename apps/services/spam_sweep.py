@@ -0,0 +1,179 @@
+"""
+后台垃圾评论清理任务
+用服务端游标按 _id 顺序流式扫描待审核评论，垃圾评论按批 bulk_write 拒绝，
+每批写入后保存检查点（last_id 和计数），任务中断后可以从检查点继续。
+拒绝数按 bulk_write 实际修改的条数累计（期间被管理员审核过的评论不计入）。
+内存占用只与批大小有关，与评论总量无关。
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+from bson import ObjectId
+from loguru import logger
+from pymongo import UpdateOne
+
+from apps.models.comment_model import 评论db, 评论清理任务db
+from apps.services.comment_service import CommentService
+from setting import COMMENT_SETTINGS
+
+# 每批写入/检查点的评论数
+BATCH_SIZE = COMMENT_SETTINGS.get('SPAM_SWEEP_BATCH_SIZE', 500)
+# 超过该时间未更新的 running 任务视为已中断（worker 被回收等），可以接着执行
+STALE_AFTER = timedelta(seconds=COMMENT_SETTINGS.get('SPAM_SWEEP_STALE_SECONDS', 120))
+
+_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now(pytz.timezone('Asia/Shanghai'))
+
+
+def _format_time(value):
+    # 刚创建的任务是带时区的上海时间，从数据库读回的是不带时区的 UTC 时间，统一按上海时间输出
+    if not value:
+        return ''
+    if value.tzinfo is None:
+        value = pytz.utc.localize(value)
+    return value.astimezone(pytz.timezone('Asia/Shanghai')).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _job_to_dict(job):
+    return {
+        'job_id': job.job_id,
+        'status': job.status,
+        'scanned': job.scanned,
+        'rejected': job.rejected,
+        'error': job.error or '',
+        'started_by': job.started_by or '',
+        'started_at': _format_time(job.started_at),
+        'updated_at': _format_time(job.updated_at),
+        'finished_at': _format_time(job.finished_at)
+    }
+
+
+def _checkpoint(job, last_id, scanned, rejected):
+    job.last_id = str(last_id)
+    job.scanned = scanned
+    job.rejected = rejected
+    job.updated_at = _now()
+    job.save()
+
+
+def _flush(collection, operations):
+    """写入一批拒绝操作，返回实际修改的评论数"""
+    if not operations:
+        return 0
+    return collection.bulk_write(operations, ordered=False).modified_count
+
+
+def run_spam_sweep(job):
+    """
+    执行清理任务（阻塞，通常在后台线程中调用）
+    Args:
+        job: 评论清理任务db 实例
+    """
+    collection = 评论db._get_collection()
+    query = {'status': 'pending'}
+    if job.last_id:
+        query['_id'] = {'$gt': ObjectId(job.last_id)}
+
+    scanned, rejected = job.scanned, job.rejected
+    operations = []
+    batch_count = 0
+    last_id = None
+
+    try:
+        cursor = collection.find(
+            query,
+            projection={'content': 1, 'username': 1},
+            sort=[('_id', 1)],
+            batch_size=BATCH_SIZE
+        )
+        for doc in cursor:
+            last_id = doc['_id']
+            scanned += 1
+            batch_count += 1
+
+            if CommentService._is_spam_comment(doc.get('content') or '', doc.get('username') or ''):
+                now = _now()
+                # 条件中带上 status，避免覆盖期间被管理员手工审核过的评论
+                operations.append(UpdateOne(
+                    {'_id': doc['_id'], 'status': 'pending'},
+                    {'$set': {
+                        'status': 'rejected',
+                        'moderated_by': 'auto-spam-filter',
+                        'moderated_at': now,
+                        'updated_at': now
+                    }}
+                ))
+
+            if batch_count >= BATCH_SIZE:
+                rejected += _flush(collection, operations)
+                _checkpoint(job, last_id, scanned, rejected)
+                operations = []
+                batch_count = 0
+
+        rejected += _flush(collection, operations)
+        if last_id is not None:
+            _checkpoint(job, last_id, scanned, rejected)
+
+        job.status = 'completed'
+        job.finished_at = _now()
+        job.updated_at = job.finished_at
+        job.save()
+        logger.info(f"垃圾评论清理完成: {job.job_id}，扫描 {scanned} 条，拒绝 {rejected} 条")
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        job.updated_at = _now()
+        job.save()
+        logger.error(f"垃圾评论清理失败: {job.job_id}: {e}")
+
+
+def start_spam_sweep(started_by='admin'):
+    """
+    启动（或接续）后台清理任务
+    同一时间只运行一个任务：已有活跃任务时直接返回该任务，
+    已中断的任务从检查点继续执行。接续时用带 status / updated_at 条件的 update_one 认领，
+    多个 worker 同时接续同一个任务时只有一个会成功。
+    Args:
+        started_by: 发起人
+    Returns:
+        dict: 任务信息
+    """
+    with _lock:
+        job = 评论清理任务db.objects(status='running').order_by('-started_at').first()
+        if job:
+            now = _now()
+            claimed = 评论清理任务db.objects(
+                job_id=job.job_id, status='running', updated_at__lt=now - STALE_AFTER
+            ).update_one(set__updated_at=now)
+            # 任务仍在运行，或已被其它 worker 接续
+            job.reload()
+            if not claimed:
+                return _job_to_dict(job)
+            logger.info(f"接续已中断的垃圾评论清理任务: {job.job_id}，检查点 {job.last_id}")
+        else:
+            job = 评论清理任务db(started_by=started_by)
+            job.save()
+
+        thread = threading.Thread(target=run_spam_sweep, args=(job,), daemon=True)
+        thread.start()
+        return _job_to_dict(job)
+
+
+def get_spam_sweep(job_id=None):
+    """
+    查询任务状态
+    Args:
+        job_id: 任务ID，为空时返回最近一次任务
+    Returns:
+        dict: 任务信息，不存在时返回 None
+    """
+    if job_id:
+        job = 评论清理任务db.objects(job_id=job_id).first()
+    else:
+        job = 评论清理任务db.objects.order_by('-started_at').first()
+    return _job_to_dict(job) if job else None
@@ -10,22 +10,25 @@ from cachetools import TTLCache
 from apps.models.article_model import *
 from flask_babel import _
 from apps.models.article_model import 文章db
+from apps.services.feed_service import feed_cache
+from apps.services.llms_service import llms_service
+from apps.services.sitemap_service import sitemap_service
 from apps.views.util import redirect_if_en
 from get_app import create_app
+from tool.mpuscript import image_sources
+from setting import FEED_SETTINGS, SITEMAP_SETTINGS
 # from openai import OpenAI
 
-from setting import ALLOWED_LANGUAGES
-
 # ==================== 缓存配置 ====================
-# 文章列表缓存 - 按语言缓存，5分钟过期，最多缓存50个语言版本
-_article_list_cache = TTLCache(maxsize=50, ttl=300)
+# 文章列表缓存 - 按语言缓存，5分钟过期，最多缓存100个列表（首页和订阅源各一份）
+_article_list_cache = TTLCache(maxsize=100, ttl=300)
 
 # 单篇文章缓存 - 10分钟过期，最多缓存200篇
 _article_cache = TTLCache(maxsize=200, ttl=600)
 
-def get_cached_article_list(lang, limit=30):
-    """获取缓存的文章列表"""
-    cache_key = f"list_{lang}_{limit}"
+def get_cached_article_list(lang, limit=30, status=None):
+    """获取缓存的文章列表，status 不为空时只取该状态的文章"""
+    cache_key = f"list_{lang}_{limit}" + (f"_{status}" if status else "")
 
     if cache_key in _article_list_cache:
         logger.debug(f"缓存命中: {cache_key}")
@@ -35,7 +38,10 @@ def get_cached_article_list(lang, limit=30):
     start_time = time.time()
 
     try:
-        dbs = 文章db.objects.filter(lang=lang).order_by('-发布时间').limit(limit).all()
+        query = {'lang': lang}
+        if status:
+            query['状态'] = status
+        dbs = 文章db.objects.filter(**query).order_by('-发布时间').limit(limit).all()
         articles = []
         for db in dbs:
             articles.append({
@@ -43,6 +49,8 @@ def get_cached_article_list(lang, limit=30):
                 'title': db.标题,
                 'image': db.image_url,
                 'desc': db.简介,
+                'date': db.发布时间,
+                'picture': image_sources(db.image_variants),
             })
 
         _article_list_cache[cache_key] = articles
@@ -89,59 +97,42 @@ def get_cached_article(article_url, lang):
 app = create_app()
 base_bp = Blueprint('base_url', import_name=__name__, url_prefix='')
 
-no_ne = []
-for i in ALLOWED_LANGUAGES:
-    if i == 'en':
-        continue
-    no_ne.append(i)
-
-regex_lang = f'<regex("{"|".join(no_ne)}"):lang>'
-
-# ===================== 静态文件路由映射 =====================
-# 优先级最高 - 必须在其他路由之前，避免被通用路由捕获
-
-@base_bp.route('/style/<path:filename>')
-def style_files(filename):
-    """CSS文件根目录访问"""
-    return send_from_directory('static/style', filename)
-
-@base_bp.route('/js/<path:filename>')
-def js_files(filename):
-    """JS文件根目录访问"""
-    return send_from_directory('static/js', filename)
-
-@base_bp.route('/css/<path:filename>')
-def css_files(filename):
-    """CSS文件根目录访问"""
-    return send_from_directory('static/css', filename)
-
-@base_bp.route('/images/<path:filename>')
-def images_files(filename):
-    """图片文件根目录访问"""
-    return send_from_directory('static/images', filename)
-
-@base_bp.route('/favicon.ico')
-def favicon():
-    """网站图标"""
-    return send_from_directory('static', 'favicon.ico')
-
-@base_bp.route('/manifest.json')
-def manifest():
-    """PWA清单文件"""
-    return send_from_directory('static', 'manifest.json')
-
-@base_bp.route('/robots.txt')
-def robots():
-    """搜索引擎爬虫文件"""
-    return send_from_directory('static', 'robots.txt')
-
-@base_bp.route('/sitemap.xml')
-def sitemap():
-    """网站地图"""
-    return send_from_directory('static', 'sitemap.xml')
+# 语言前缀（en 不带前缀），由 get_app.LanguageConverter 用集合校验
+regex_lang = '<lang:lang>'
 
 # ===================== 其他路由 =====================
 
+# 网站地图：/sitemap.xml 与 /sitemap_index.xml 都返回分片索引
+@base_bp.route('/sitemap.xml', methods=['GET'])
+@base_bp.route('/sitemap_index.xml', methods=['GET'])
+def sitemap_index():
+    return sitemap_service.serve_index()
+
+
+@base_bp.route('/sitemaps/<string:name>', methods=['GET'])
+def sitemap_shard(name):
+    return sitemap_service.serve_shard(name)
+
+
+# 给大模型的站点说明，由文章生成
+@base_bp.route('/llms.txt', methods=['GET'])
+def llms_txt():
+    return llms_service.serve_file('llms.txt')
+
+
+@base_bp.route('/llms-full.txt', methods=['GET'])
+def llms_full_txt():
+    return llms_service.serve_file('llms-full.txt')
+
+
+# RSS 订阅源：/feed.xml 固定为英文，其它语言带前缀
+@base_bp.route('/feed.xml', methods=['GET'])
+@base_bp.route(f'/{regex_lang}/feed.xml', methods=['GET'])
+def feed(lang='en'):
+    articles = get_cached_article_list(lang, limit=FEED_SETTINGS['LIMIT'], status=SITEMAP_SETTINGS['PUBLISHED_STATUS'])
+    return feed_cache.response(lang, articles)
+
+
 @base_bp.route(f'{regex_lang}/<int:ids>.html', methods=['GET'])
 @base_bp.route(f'<int:ids>.html', methods=['GET'])
 @redirect_if_en('base_url')
@@ -233,7 +224,8 @@ def article_info_demo(article_url, lang=None):
             "article": article,
         }
 
-        return render_template('web/content.html', article=article, info=info, datas=datas)
+        return render_template('web/content.html', article=article, info=info, datas=datas,
+                               article_url=article_url)
 
     else:
         return render_template('base/404.html'), 404
@@ -303,6 +295,7 @@ def get_cached_category_list(category, lang, limit=100):
                 'title': db.标题,
                 'image': db.image_url,
                 'desc': db.简介,
+                'picture': image_sources(db.image_variants),
             })
 
         _category_cache[cache_key] = articles
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, g
 from apps.services.comment_service import CommentService
+from apps.services.like_buffer import like_buffer
+from apps.services.spam_sweep import start_spam_sweep, get_spam_sweep
 from apps.models.comment_model import 评论db, 回复
 from datetime import datetime
 import pytz
@@ -16,6 +18,17 @@ def get_request_info():
     }
 
 
+def rate_limited_response(result):
+    """频率超限响应（429）"""
+    response = jsonify({
+        'success': False,
+        'message': result['message']
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(result.get('retry_after', 0))
+    return response
+
+
 @comment_api.route('/<path:article_url>', methods=['GET'])
 def get_comments(article_url):
     """获取评论列表"""
@@ -75,6 +88,9 @@ def create_comment(article_url):
             request_info=request_info
         )
         
+        if result.get('rate_limited'):
+            return rate_limited_response(result)
+        
         if result['success']:
             return jsonify({
                 'success': True,
@@ -103,14 +119,18 @@ def like_comment(comment_id):
     """点赞评论"""
     try:
         # 调用服务点赞评论
-        result = CommentService.like_comment(comment_id)
+        result = CommentService.like_comment(comment_id, request_info=get_request_info())
+        
+        if result.get('rate_limited'):
+            return rate_limited_response(result)
         
         if result['success']:
             return jsonify({
                 'success': True,
                 'message': result['message'],
                 'data': {
-                    'likes': result['likes']
+                    'likes': result['likes'],
+                    'pending': result['pending']
                 }
             })
         else:
@@ -155,6 +175,9 @@ def add_reply(comment_id):
             request_info=request_info
         )
         
+        if result.get('rate_limited'):
+            return rate_limited_response(result)
+        
         if result['success']:
             return jsonify({
                 'success': True,
@@ -181,14 +204,18 @@ def like_reply(comment_id, reply_id):
     """点赞回复"""
     try:
         # 调用服务点赞回复
-        result = CommentService.like_reply(comment_id, reply_id)
+        result = CommentService.like_reply(comment_id, reply_id, request_info=get_request_info())
+        
+        if result.get('rate_limited'):
+            return rate_limited_response(result)
         
         if result['success']:
             return jsonify({
                 'success': True,
                 'message': result['message'],
                 'data': {
-                    'likes': result['likes']
+                    'likes': result['likes'],
+                    'pending': result['pending']
                 }
             })
         else:
@@ -277,6 +304,61 @@ def moderate_comment(comment_id):
         }), 500
 
 
+@comment_api.route('/admin/batch', methods=['PUT'])
+def batch_moderate_comments():
+    """管理员批量审核评论"""
+    try:
+        # 这里应该添加管理员权限检查
+        
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': 'Content-Type must be application/json'
+            }), 400
+        
+        data = request.get_json()
+        
+        status = data.get('status')
+        if status not in ['approved', 'rejected']:
+            return jsonify({
+                'success': False,
+                'message': 'Status must be "approved" or "rejected"'
+            }), 400
+        
+        comment_ids = data.get('comment_ids')
+        if not isinstance(comment_ids, list) or not comment_ids:
+            return jsonify({
+                'success': False,
+                'message': 'comment_ids must be a non-empty list'
+            }), 400
+        
+        moderator = data.get('moderated_by', 'admin')  # 实际项目中应该从用户session获取
+        
+        # 调用服务批量审核
+        result = CommentService.bulk_moderate(comment_ids, status, moderator)
+        
+        if result['success']:
+            return jsonify({
+                'success': True,
+                'message': result['message'],
+                'data': {
+                    'updated': result['updated'],
+                    'articles': result['articles']
+                }
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'message': result['message']
+            }), 400
+            
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Internal server error: {str(e)}'
+        }), 500
+
+
 @comment_api.route('/admin/pending', methods=['GET'])
 def get_pending_comments():
     """获取待审核评论列表"""
@@ -326,6 +408,63 @@ def get_pending_comments():
         }), 500
 
 
+@comment_api.route('/admin/spam-sweep', methods=['POST'])
+def start_spam_sweep_job():
+    """启动后台垃圾评论清理任务"""
+    try:
+        # 这里应该添加管理员权限检查
+        data = request.get_json(silent=True) or {}
+        job = start_spam_sweep(data.get('started_by', 'admin'))
+        return jsonify({
+            'success': True,
+            'data': job
+        }), 202
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Internal server error: {str(e)}'
+        }), 500
+
+
+@comment_api.route('/admin/spam-sweep', methods=['GET'])
+@comment_api.route('/admin/spam-sweep/<job_id>', methods=['GET'])
+def get_spam_sweep_job(job_id=None):
+    """查询垃圾评论清理任务进度（不传job_id时返回最近一次任务）"""
+    try:
+        job = get_spam_sweep(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'message': 'Job not found'
+            }), 404
+        return jsonify({
+            'success': True,
+            'data': job
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Internal server error: {str(e)}'
+        }), 500
+
+
+@comment_api.route('/admin/metrics', methods=['GET'])
+def get_comment_metrics():
+    """评论系统运行指标（点赞缓冲深度、刷新耗时等，按当前worker统计）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                'like_buffer': like_buffer.get_stats()
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Internal server error: {str(e)}'
+        }), 500
+
+
 # 错误处理
 @comment_api.errorhandler(404)
 def not_found(error):
@@ -1,7 +1,7 @@
 from functools import wraps
 from loguru import logger
 
-from flask import url_for, redirect
+from flask import url_for, redirect, g
 from flask_login import logout_user
 
 
@@ -18,7 +18,8 @@ def redirect_if_en(blueprint_name):
                 return redirect(url)
 
             if lang is None:
-                kwargs['lang'] = 'en'
+                # 无语言前缀的路径，直接使用请求开始时解析好的语言
+                kwargs['lang'] = g.get('locale', 'en')
 
             return func(*args, **kwargs)
 
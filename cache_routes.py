@@ -26,6 +26,43 @@ def cache_status():
             'error': str(e)
         }), 500
 
+@cache_bp.route('/cache/translations')
+def translation_status():
+    """翻译目录预加载状态（每种语言的条目数、加载耗时、内存）"""
+    from translation_preload import get_translation_stats
+    return jsonify({
+        'success': True,
+        'data': get_translation_stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@cache_bp.route('/cache/static')
+def static_status():
+    """静态文件内存缓存状态"""
+    from static_assets import static_files, asset_manifest
+    return jsonify({
+        'success': True,
+        'data': {
+            'files': static_files.get_stats(),
+            'manifest': asset_manifest.get_stats()
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+
+@cache_bp.route('/cache/sitemap')
+def sitemap_status():
+    """网站地图、llms.txt 刷新状态"""
+    from apps.services.llms_service import llms_service
+    from apps.services.sitemap_service import sitemap_service
+    return jsonify({
+        'success': True,
+        'data': {
+            'sitemap': sitemap_service.get_stats(),
+            'llms': llms_service.get_stats()
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+
 @cache_bp.route('/cache/dashboard')
 def cache_dashboard():
     """缓存监控仪表板"""
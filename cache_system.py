@@ -180,6 +180,7 @@ class PerformanceCache:
 article_cache = PerformanceCache(max_items=300, default_timeout=600)  # 10分钟
 page_cache = PerformanceCache(max_items=100, default_timeout=300)     # 5分钟
 language_cache = PerformanceCache(max_items=50, default_timeout=3600) # 1小时
+fragment_cache = PerformanceCache(max_items=500, default_timeout=3600) # 模板片段（键只含语言），1小时
 
 def cached_function(cache_instance=None, timeout=None, key_func=None):
     """
@@ -276,6 +277,7 @@ def get_cache_status():
         'article_cache': article_cache.get_stats(),
         'page_cache': page_cache.get_stats(),
         'language_cache': language_cache.get_stats(),
+        'fragment_cache': fragment_cache.get_stats(),
         'timestamp': datetime.now().isoformat()
     }
 
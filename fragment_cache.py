@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Jinja 模板片段缓存
+用法:
+    {% cache 'footer', get_locale() %}
+        ...只依赖上述键的模板内容...
+    {% endcache %}
+
+片段按 (模板名, 行号, 键) 缓存在 cache_system.fragment_cache 中，
+页头、页脚、语言选择器等与文章无关的部分每种语言只渲染一次。
+键只能是取值有限的内容（语言等），不要把路径、Host 等请求数据放进键里。
+
+片段中随页面变化的少量值（例如语言选择器里各语言版本的地址）用占位符，
+在缓存外算好后通过 fill 填入:
+    {% cache 'language-selector', get_locale() fill language_urls(no_lang_path) %}
+        <a href="{{ fragment_slot(lang.code) }}">...</a>
+    {% endcache %}
+fragment_slot 只能在带 fill 的 {% cache %} 中使用。
+"""
+
+import re
+
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup, escape
+
+from cache_system import fragment_cache
+
+SLOT_MARK = '\x00'
+SLOT_PATTERN = re.compile(f'{SLOT_MARK}([^{SLOT_MARK}]*){SLOT_MARK}')
+
+
+def fragment_slot(name):
+    """片段中的占位符，渲染时由 fill 的映射替换"""
+    return Markup(f'{SLOT_MARK}{name}{SLOT_MARK}')
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, ... [fill 映射] %} ... {% endcache %}"""
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache_enabled=True)
+        environment.globals['fragment_slot'] = fragment_slot
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        fill = parser.parse_expression() if parser.stream.skip_if('name:fill') else nodes.Const(None)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+
+        prefix = nodes.Const(f'{parser.name}:{lineno}')
+        call = self.call_method('_render_cached', [prefix, nodes.List(parts), fill])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, prefix, parts, fill, caller):
+        # 调试模式下不缓存，方便修改模板
+        if not self.environment.fragment_cache_enabled or current_app.debug:
+            value = caller()
+        else:
+            cache_key = f"fragment:{prefix}:" + ':'.join(str(part) for part in parts)
+            value = fragment_cache.get(cache_key)
+            if value is None:
+                value = caller()
+                fragment_cache.set(cache_key, value)
+        if fill is None:
+            return value
+        return Markup(SLOT_PATTERN.sub(lambda match: str(escape(fill.get(match.group(1), ''))), value))
@@ -1,5 +1,5 @@
 from loguru import logger
-from flask import Flask, request
+from flask import Flask, request, g, has_request_context
 from flask_babel import Babel
 try:
     from flask_compress import Compress
@@ -7,32 +7,42 @@ try:
 except ImportError:
     HAS_COMPRESS = False
 from flask_mongoengine import MongoEngine
-from werkzeug.routing import BaseConverter
+from werkzeug.routing import BaseConverter, ValidationError
 
+from fragment_cache import FragmentCacheExtension
+from template_cache import configure_template_cache
 from setting import mongo_uri, ALLOWED_LANGUAGES
+from static_assets import asset_manifest, static_files
+
+# 支持的语言集合（O(1) 查找）
+SUPPORTED_LOCALES = frozenset(ALLOWED_LANGUAGES)
+
+
+def parse_locale(path):
+    """从路径第一段解析语言，不是支持的语言时返回 'en'"""
+    first = path.lstrip('/').split('/', 1)[0]
+    return first if first in SUPPORTED_LOCALES else 'en'
+
+
+def resolve_locale():
+    """请求开始时解析一次语言并保存到 g，后续 Babel、模板、视图都直接读取"""
+    g.locale = parse_locale(request.path)
 
 
 def get_locale():
-    # 获取语言
-    path_parts = request.path.strip('/').split('/')
-    lang = 'en'
-    if path_parts and path_parts[0] in app.config['BABEL_SUPPORTED_LOCALES']:
-        # 从路径中提取语言代码并设置到 session
-        lang = path_parts[0]
-    # loguru.logger.info(f"语言为{lang}")
+    # 获取语言（每个请求只解析一次）
+    if not has_request_context():
+        return 'en'
+    lang = g.get('locale')
+    if lang is None:
+        resolve_locale()
+        lang = g.locale
     return lang
 
 
 def no_en_get_locale():
-    path_parts = request.path.strip('/').split('/')
-    # 过滤掉空字符串
-    path_parts = [part for part in path_parts if part]
-    logger.info(path_parts)
-    lang = 'en'
-    if path_parts and path_parts[0] in app.config['BABEL_SUPPORTED_LOCALES']:
-        # 从路径中提取语言代码并设置到 session
-        lang = path_parts[0]
-    logger.info(f"语言为{lang}")
+    # 英文不加语言前缀，返回None
+    lang = get_locale()
     if lang == 'en':
         return None
     return lang
@@ -53,7 +63,6 @@ class RegexConverter(BaseConverter):
         :param value:
         :return:
         """
-        logger.info(f"999999：{value}")
         return value
 
     def to_url(self, value):
@@ -62,9 +71,28 @@ class RegexConverter(BaseConverter):
         :param value:
         :return:
         """
-        val = super(RegexConverter, self).to_url(value)
-        logger.info(f"888888:{value}")
-        return val
+        return super(RegexConverter, self).to_url(value)
+
+
+class LanguageConverter(BaseConverter):
+    """
+    语言前缀转换器 <lang:lang>
+    正则只匹配形如语言代码的路径段，再用集合判断是否为支持的语言（不含默认语言en），
+    避免把 30 个语言拼成多选正则编译进每条路由。
+    """
+    regex = '[a-z]{2,3}'
+
+    def __init__(self, map, *args, **kwargs):
+        super(LanguageConverter, self).__init__(map, *args, **kwargs)
+        self.locales = SUPPORTED_LOCALES - {'en'}
+
+    def to_python(self, value):
+        if value not in self.locales:
+            raise ValidationError()
+        return value
+
+    def to_url(self, value):
+        return value
 
 
 def create_app():
@@ -74,6 +102,11 @@ def create_app():
 
     # Register the custom converter
     app.url_map.converters['regex'] = RegexConverter
+    app.url_map.converters['lang'] = LanguageConverter
+    # 模板片段缓存 {% cache %}
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    # 模板字节码缓存（磁盘），生产环境关闭自动重载
+    configure_template_cache(app)
     app.url_map.strict_slashes = False  # 自动重定向尾部/问题
     babel = Babel(app)
 
@@ -110,7 +143,13 @@ def create_app():
     else:
         logger.warning("⚠️ flask-compress未安装，压缩功能未启用")
 
+    # 静态资源指纹：url_for('static') 输出带哈希的文件名
+    asset_manifest.init_app(app)
+    # 全部静态文件由 static 端点统一发送（内存缓存、预压缩、指纹）
+    static_files.init_app(app)
+
     babel.init_app(app, locale_selector=get_locale)
+    app.before_request(resolve_locale)
 
     #  设置login验证
     return app
@@ -119,58 +158,10 @@ def create_app():
 app = create_app()
 db = MongoEngine(app)
 
-# 静态文件缓存辅助函数
-def add_cache_headers(response, max_age=86400):
-    """添加缓存头"""
-    response.headers['Cache-Control'] = f'public, max-age={max_age}'
-    return response
-
-# 临时解决方案：添加全局静态文件路由处理器
-@app.route('/style/<path:filename>')
-def global_style_files(filename):
-    """全局CSS文件根目录访问 - 临时解决方案"""
-    from flask import send_from_directory
-    response = send_from_directory('static/style', filename)
-    return add_cache_headers(response, 604800)  # 7天
-
-@app.route('/js/<path:filename>')
-def global_js_files(filename):
-    """全局JS文件根目录访问 - 临时解决方案"""
-    from flask import send_from_directory
-    response = send_from_directory('static/js', filename)
-    return add_cache_headers(response, 604800)  # 7天
-
-@app.route('/css/<path:filename>')
-def global_css_files(filename):
-    """全局CSS文件根目录访问 - 临时解决方案"""
-    from flask import send_from_directory
-    response = send_from_directory('static/css', filename)
-    return add_cache_headers(response, 604800)  # 7天
-
-@app.route('/dist/<path:filename>')
-def global_dist_files(filename):
-    """构建后的静态文件 - 长期缓存"""
-    from flask import send_from_directory
-    response = send_from_directory('static/dist', filename)
-    return add_cache_headers(response, 31536000)  # 1年
-
-@app.route('/images/<path:filename>')
-def global_images_files(filename):
-    """全局图片文件根目录访问 - 临时解决方案"""
-    from flask import send_from_directory
-    response = send_from_directory('static/images', filename)
-    return add_cache_headers(response, 2592000)  # 30天
-
-@app.route('/favicon.ico')
-def global_favicon():
-    """全局网站图标 - 临时解决方案"""
-    from flask import send_from_directory
-    response = send_from_directory('static', 'favicon.ico')
-    return add_cache_headers(response, 2592000)  # 30天
-
 # 全局404错误处理器
 @app.errorhandler(404)
 def page_not_found(e):
     """全局404页面 - 品牌化设计"""
     from flask import render_template
     return render_template('base/404.html'), 404
+
@@ -16,3 +16,21 @@ loglevel = "info"
 
 # 性能优化
 preload_app = True
+
+
+def pre_fork(server, worker):
+    """fork 前冻结已预加载的对象（翻译目录等），worker 以写时复制方式共享"""
+    from translation_preload import freeze_shared_objects
+    freeze_shared_objects()
+
+
+def post_fork(server, worker):
+    """worker 启动后开始检查中断的图片任务（被回收的 worker 留下的任务由其它 worker 重新排队）"""
+    from apps.services.image_jobs import start_image_job_sweeper
+    start_image_job_sweeper()
+
+
+def worker_exit(server, worker):
+    """worker 退出前把点赞缓冲写入数据库"""
+    from apps.services.like_buffer import like_buffer
+    like_buffer.flush()
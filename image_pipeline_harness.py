@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+图床流水线验证脚本
+使用本地图床（tool.local_s3.LocalS3Client，临时目录）代替 R2，上传一张图片并检查:
+- 宽度阶梯 × 格式的每个版本都已上传，尺寸、格式正确
+- image_url 指向回退格式中不超过 FALLBACK_WIDTH 的一级
+- 与原来单张 0.8 倍 WebP 的体积对比
+- 低清占位图（data URI）已写入清单
+- 相同内容再次上传时不重新处理和上传（本进程索引 / 图床上的清单对象两种情况）
+
+用法: python image_pipeline_harness.py [图片路径]（不传时生成一张测试图）
+"""
+
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+logger.remove()
+logger.add(sys.stderr, level='WARNING')
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from setting import IMAGE_SETTINGS  # noqa: E402
+from tool import mpuscript  # noqa: E402
+from tool.local_s3 import LocalS3Client  # noqa: E402
+
+
+def sample_image(width=1600, height=1200):
+    """生成一张带细节的 JPEG 测试图"""
+    img = Image.effect_mandelbrot((width, height), (-2, -1.2, 1, 1.2), 100).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    rng = random.Random(0)
+    for _ in range(300):
+        x, y = rng.randint(0, width - 100), rng.randint(0, height - 100)
+        draw.ellipse([x, y, x + rng.randint(5, 100), y + rng.randint(5, 100)],
+                     fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    stream = io.BytesIO()
+    img.save(stream, format='JPEG', quality=90)
+    stream.seek(0)
+    return stream
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            source = io.BytesIO(f.read())
+    else:
+        source = sample_image()
+    with Image.open(source) as img:
+        source_size = img.size
+    source.seek(0)
+    legacy_size = len(mpuscript.compress_image(source).getvalue())
+
+    root = tempfile.mkdtemp(prefix='image-harness-')
+    mpuscript.s3_client = LocalS3Client(root)
+    ok = True
+    try:
+        source.seek(0)
+        start = time.perf_counter()
+        manifest = mpuscript.upload_image(source)
+        elapsed = time.perf_counter() - start
+        if manifest is None:
+            print("❌ 上传失败")
+            return 1
+
+        print(f"🔍 图床流水线验证（原图 {source_size[0]}x{source_size[1]}，格式 {', '.join(mpuscript.IMAGE_FORMATS)}）")
+        print("=" * 72)
+        for fmt, items in manifest['variants'].items():
+            for width, url in items:
+                path = os.path.join(root, mpuscript.IMAGE_BUCKET, url.rsplit('/', 1)[-1])
+                with Image.open(path) as img:
+                    valid = img.format.lower() == fmt and img.width == width
+                ok = ok and valid
+                print(f"{fmt:>5} {width:>5}w: {os.path.getsize(path) / 1024:7.1f}KB {'✓' if valid else '✗'}")
+        expected = [width for width, _ in manifest['variants'][IMAGE_SETTINGS['FALLBACK_FORMAT']]
+                    if width <= IMAGE_SETTINGS['FALLBACK_WIDTH']]
+        ok = ok and manifest['src'].endswith(f"-{expected[-1]}w.{IMAGE_SETTINGS['FALLBACK_FORMAT']}")
+        print(f"image_url: {manifest['src']}")
+        placeholder = manifest.get('placeholder') or ''
+        ok = ok and placeholder.startswith('data:image/webp;base64,')
+        print(f"占位图: {len(placeholder)} 字节（data URI）")
+        print(f"原方案单张 WebP: {legacy_size / 1024:.1f}KB | 生成全部版本耗时 {elapsed * 1000:.0f}ms")
+
+        objects = sorted(os.listdir(os.path.join(root, mpuscript.IMAGE_BUCKET)))
+        for label in ('本进程索引', '图床清单'):
+            if label == '图床清单':
+                mpuscript._manifest_index.clear()
+            source.seek(0)
+            start = time.perf_counter()
+            again = mpuscript.upload_image(source)
+            elapsed = time.perf_counter() - start
+            same = again == manifest and sorted(os.listdir(os.path.join(root, mpuscript.IMAGE_BUCKET))) == objects
+            ok = ok and same
+            print(f"重复上传（{label}）: {elapsed * 1000:.1f}ms，{'地址不变、没有新对象' if same else '产生了新对象'}")
+    finally:
+        shutil.rmtree(root)
+
+    print("✅ 全部版本已生成" if ok else "❌ 验证未通过")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
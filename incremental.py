@@ -0,0 +1,143 @@
+"""
+增量生成的公共部分（sitemap.py、llms.py 共用）
+- 页面地址：page_url 与站点的 URL 规则一致（en 不带语言前缀）
+- 水位线：状态文件记录已处理到的 更新时间，只查询水位线之后变化的文章；
+  新水位线回退 WATERMARK_MARGIN，避免漏掉时间戳较早但提交较晚的修改
+- 文件锁：多个 worker 可能同时触发更新，同一状态文件的更新串行执行
+- 原子写入：先写临时文件再 os.replace，读者不会读到写了一半的文件
+- 合并更新：DebouncedUpdate 把连续的文章变更合并成一次后台更新
+"""
+
+import fcntl
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytz
+from loguru import logger
+
+from setting import SITEMAP_SETTINGS
+
+HOST = SITEMAP_SETTINGS['HOST']
+# 水位线回退的安全余量：避免漏掉时间戳较早但提交较晚的修改
+WATERMARK_MARGIN = timedelta(seconds=60)
+
+
+def page_url(lang, article_url=None):
+    """en 不带语言前缀；首页不带结尾的 /（与原 sitemap 一致）"""
+    prefix = HOST if lang == 'en' else f'{HOST}{lang}'
+    if article_url is None:
+        return prefix
+    return f'{prefix.rstrip("/")}/{article_url}.html'
+
+
+def to_utc(value):
+    # 数据库里是不带时区的 UTC 时间
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=pytz.utc)
+    return value.astimezone(pytz.utc)
+
+
+def next_watermark(previous, seen, start_time):
+    """
+    新水位线：不超过本次开始时间减去余量，最近的修改下次会再确认一遍
+    Args:
+        previous: 原水位线
+        seen: 本次读到的最大 更新时间
+        start_time: 本次更新的开始时间
+    """
+    return max(previous, min(seen, start_time - WATERMARK_MARGIN))
+
+
+def replace_atomic(path, data):
+    """原子写入字节串"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def replace_with_gzip(tmp_path, path):
+    """
+    把写好的临时文件原子替换到 path，同时生成 path.gz 副本
+    """
+    with open(tmp_path, 'rb') as f, open(f'{tmp_path}.gz', 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+            gz.write(f.read())
+    os.replace(tmp_path, path)
+    # gzip 副本与原文件 mtime 一致才会被静态层使用（见 static_assets.precompress）
+    stat = os.stat(path)
+    os.utime(f'{tmp_path}.gz', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(f'{tmp_path}.gz', f'{path}.gz')
+
+
+def load_state(state_path):
+    """读取增量状态（watermark 转为 datetime，其余字段原样返回），不存在时返回 None"""
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    state['watermark'] = datetime.fromisoformat(state['watermark'])
+    return state
+
+
+def save_state(state, state_path):
+    """原子写入增量状态，其余字段需能直接 JSON 序列化"""
+    data = {**state, 'watermark': state['watermark'].isoformat()}
+    replace_atomic(state_path, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8'))
+
+
+@contextmanager
+def build_lock(state_path):
+    """多个 worker 可能同时触发更新，用文件锁串行化"""
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+    with open(f'{state_path}.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class DebouncedUpdate:
+    """
+    合并后台更新：第一次 schedule 后等待 delay 秒，期间记录的变更合并后调用一次 update(changed)
+    Args:
+        name: 日志中的名称
+        delay: 合并等待时间（秒）
+        update: 更新函数，参数为期间记录的变更列表
+    """
+
+    def __init__(self, name, delay, update):
+        self.name = name
+        self.delay = delay
+        self.update = update
+        self._lock = threading.Lock()
+        self._changes = set()
+        self._timer = None
+
+    def _run(self):
+        with self._lock:
+            changed = list(self._changes)
+            self._changes.clear()
+            self._timer = None
+        try:
+            self.update(changed)
+        except Exception as e:
+            logger.error(f"{self.name} 增量更新失败: {e}")
+
+    def schedule(self, change=None):
+        """记录一项变更（可为空）并在需要时启动定时器"""
+        with self._lock:
+            if change is not None:
+                self._changes.add(change)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self._run)
+                self._timer.daemon = True
+                self._timer.start()
@@ -0,0 +1,207 @@
+# llms.txt / llms-full.txt 生成
+"""
+llms.txt 生成
+- 固定的介绍文字在 templates/llms/ 下的模板里，文章列表由已发布文章生成
+- 每种语言的文章列表单独生成一个片段（cache/llms/<语言>.md、<语言>-full.md），
+  服务端游标按 ids 顺序流式读取，只取标题、url、简介
+- 增量更新：状态文件记录水位线（已处理到的 更新时间），只重新生成有变化的语言的片段，
+  再把片段拼进模板写出 static/llms.txt、static/llms-full.txt（各带同 mtime 的 .gz 副本）
+- 每个文件先写临时文件再 os.replace
+
+用法: python llms.py [--full]
+"""
+
+import os
+import re
+import sys
+from datetime import datetime
+
+import pytz
+from jinja2 import Environment, FileSystemLoader
+from loguru import logger
+
+import incremental
+from incremental import DebouncedUpdate, WATERMARK_MARGIN, build_lock, next_watermark, page_url, replace_with_gzip, to_utc
+from setting import LLMS_SETTINGS, LANGUAGES, SITEMAP_SETTINGS
+
+PUBLISHED_STATUS = SITEMAP_SETTINGS['PUBLISHED_STATUS']
+OUTPUTS = LLMS_SETTINGS['OUTPUTS']
+FRAGMENT_DIR = LLMS_SETTINGS['FRAGMENT_DIR']
+STATE_PATH = LLMS_SETTINGS['STATE_PATH']
+SUMMARY_LENGTH = LLMS_SETTINGS['SUMMARY_LENGTH']
+UPDATE_DELAY = LLMS_SETTINGS['UPDATE_DELAY']
+
+# 片段后缀 -> 输出文件（模板与输出同名）
+VARIANTS = (('', 'llms.txt'), ('-full', 'llms-full.txt'))
+
+_environment = Environment(loader=FileSystemLoader('templates'), trim_blocks=True, keep_trailing_newline=True)
+
+
+def _text(value):
+    return re.sub(r'\s+', ' ', value or '').strip()
+
+
+def _title(value):
+    # 标题放在 [] 中，去掉会破坏 Markdown 链接的方括号
+    return _text(value).replace('[', '(').replace(']', ')')
+
+
+def summarize(text, length=SUMMARY_LENGTH):
+    """简介的第一句，超过 length 个字符时截断"""
+    text = _text(text)
+    match = re.search(r'(?<=[.!?。！？])\s', text)
+    if match and match.start() <= length:
+        return text[:match.start()]
+    return text if len(text) <= length else text[:length].rstrip() + '…'
+
+
+def _fragment_path(lang, suffix, fragment_dir=FRAGMENT_DIR):
+    return os.path.join(fragment_dir, f'{lang}{suffix}.md')
+
+
+def published_articles(lang, batch_size=1000):
+    """按 ids 顺序流式读取一种语言的已发布文章"""
+    from apps.models.article_model import 文章db
+
+    return 文章db._get_collection().find(
+        {'状态': PUBLISHED_STATUS, 'lang': lang},
+        projection={'_id': 0, 'article_url': 1, '标题': 1, '简介': 1},
+        sort=[('ids', 1)],
+        batch_size=batch_size
+    )
+
+
+def write_section(lang, fragment_dir=FRAGMENT_DIR):
+    """
+    重新生成一种语言的两个片段
+    Returns:
+        int: 文章数（没有文章时删除片段）
+    """
+    count = 0
+    paths = {suffix: _fragment_path(lang, suffix, fragment_dir) for suffix, _ in VARIANTS}
+    files = {suffix: open(f'{path}.tmp', 'w', encoding='utf-8') for suffix, path in paths.items()}
+    try:
+        for doc in published_articles(lang):
+            if not doc.get('article_url'):
+                continue
+            url = page_url(lang, doc['article_url'])
+            title = _title(doc.get('标题')) or doc['article_url']
+            summary = summarize(doc.get('简介'))
+            files[''].write(f'- [{title}]({url})' + (f': {summary}\n' if summary else '\n'))
+            files['-full'].write(f'### [{title}]({url})\n\n{_text(doc.get("简介"))}\n\n')
+            count += 1
+    finally:
+        for f in files.values():
+            f.close()
+
+    for path in paths.values():
+        if count:
+            os.replace(f'{path}.tmp', path)
+        else:
+            os.remove(f'{path}.tmp')
+            if os.path.exists(path):
+                os.remove(path)
+    return count
+
+
+def _sections(suffix, state, fragment_dir):
+    """按 setting.LANGUAGES 的顺序逐个读取片段，交给模板流式渲染"""
+    for language in LANGUAGES:
+        if state['sections'].get(language['code']):
+            with open(_fragment_path(language['code'], suffix, fragment_dir), encoding='utf-8') as f:
+                yield language, f.read().rstrip('\n')
+
+
+def write_outputs(state, fragment_dir=FRAGMENT_DIR, outputs=OUTPUTS):
+    """把片段拼进模板，写出 llms.txt / llms-full.txt 及 .gz 副本"""
+    language_names = [language['name'] for language in LANGUAGES if state['sections'].get(language['code'])]
+    for suffix, name in VARIANTS:
+        path = outputs[name]
+        tmp_path = f'{path}.tmp'
+        stream = _environment.get_template(f'llms/{name}').generate(
+            sections=_sections(suffix, state, fragment_dir),
+            language_names=language_names,
+            home_url=page_url
+        )
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(stream)
+        replace_with_gzip(tmp_path, path)
+
+
+def load_state(state_path=STATE_PATH):
+    """读取增量状态，不存在时返回 None"""
+    return incremental.load_state(state_path)
+
+
+def save_state(state, state_path=STATE_PATH):
+    """原子写入增量状态"""
+    incremental.save_state({'watermark': state['watermark'], 'sections': state['sections']}, state_path)
+
+
+def update_llms(changed_langs=(), full=False, fragment_dir=FRAGMENT_DIR, outputs=OUTPUTS, state_path=STATE_PATH):
+    """
+    更新 llms.txt / llms-full.txt
+    Args:
+        changed_langs: 额外需要重新生成的语言（删除文章、修改语言时的原语言）
+        full: 重新生成全部语言
+    Returns:
+        list: 重新生成的语言
+    """
+    from apps.models.article_model import 文章db
+
+    with build_lock(state_path):
+        os.makedirs(fragment_dir, exist_ok=True)
+        start_time = datetime.now(pytz.utc)
+        state = None if full else load_state(state_path)
+        if state is None or not all(os.path.exists(path) for path in outputs.values()):
+            state = {'watermark': start_time - WATERMARK_MARGIN, 'sections': {}}
+            affected = {language['code'] for language in LANGUAGES}
+            watermark = state['watermark']
+        else:
+            affected = {lang for lang in changed_langs if lang}
+            watermark = state['watermark']
+            cursor = 文章db._get_collection().find(
+                {'更新时间': {'$gt': watermark}},
+                projection={'_id': 0, 'lang': 1, '更新时间': 1}
+            )
+            for doc in cursor:
+                if doc.get('lang'):
+                    affected.add(doc['lang'])
+                watermark = max(watermark, to_utc(doc['更新时间']))
+            if not affected:
+                return []
+
+        for lang in sorted(affected):
+            count = write_section(lang, fragment_dir)
+            if count:
+                state['sections'][lang] = count
+            else:
+                state['sections'].pop(lang, None)
+
+        write_outputs(state, fragment_dir, outputs)
+        state['watermark'] = next_watermark(state['watermark'], watermark, start_time)
+        save_state(state, state_path)
+        logger.info(f"📝 llms.txt 已更新: 重新生成 {len(affected)} 种语言，共 {sum(state['sections'].values())} 篇文章，"
+                    f"耗时 {(datetime.now(pytz.utc) - start_time).total_seconds() * 1000:.0f}ms")
+        return sorted(affected)
+
+
+_pending_update = DebouncedUpdate('llms.txt', UPDATE_DELAY, update_llms)
+
+
+def schedule_llms_update(lang=None):
+    """
+    文章变更后调用：稍后在后台线程中合并执行一次增量更新
+    Args:
+        lang: 文章原来的语言（删除文章或修改语言时传入）
+    """
+    _pending_update.schedule(lang or None)
+
+
+if __name__ == '__main__':
+    from mongoengine import connect
+    from setting import mongo_uri
+
+    connect(host=mongo_uri)
+    langs = update_llms(full='--full' in sys.argv)
+    print(f"✅ llms.txt: 重新生成 {len(langs)} 种语言")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+路由微基准测试
+对 app.url_map 中的每条规则生成示例URL，分别测量 URL 匹配和 url_for 反向生成的耗时，
+对比旧的 30 选 1 正则转换器 (regex) 与集合校验的语言转换器 (lang)；
+并测量每个请求的语言解析开销（get_locale 在模板中一次渲染约调用 30 次）。
+
+用法: python route_benchmark.py [轮数]
+"""
+
+import os
+import sys
+import time
+
+from flask import request
+from loguru import logger
+from werkzeug.routing import Map, Rule
+
+from get_app import RegexConverter, LanguageConverter, no_en_get_locale, resolve_locale
+from setting import ALLOWED_LANGUAGES, LANGUAGES
+
+logger.remove()
+logger.add(sys.stderr, level='WARNING')
+
+from run import app  # noqa: E402
+
+LEGACY_LANG = '<regex("{}"):lang>'.format('|'.join(code for code in ALLOWED_LANGUAGES if code != 'en'))
+
+# 各类型转换器的示例参数
+SAMPLE_VALUES = {
+    'IntegerConverter': 1,
+    'PathConverter': 'a/b',
+    'LanguageConverter': 'zh',
+    'RegexConverter': 'zh',
+}
+
+
+def build_map(mode):
+    """按模式复制 app 的全部规则: lang 为当前实现，regex 为旧的多选正则实现"""
+    url_map = Map(converters={'regex': RegexConverter, 'lang': LanguageConverter}, strict_slashes=False)
+    for rule in app.url_map.iter_rules():
+        rule_string = rule.rule
+        if mode == 'regex':
+            rule_string = rule_string.replace('<lang:lang>', LEGACY_LANG)
+        url_map.add(Rule(rule_string, endpoint=rule.endpoint, methods=rule.methods))
+    return url_map
+
+
+def sample_requests(url_map):
+    """为每条 GET 规则生成 (endpoint, 参数, URL)"""
+    adapter = url_map.bind('localhost')
+    samples = []
+    for rule in url_map.iter_rules():
+        if 'GET' not in (rule.methods or ()):
+            continue
+        values = {
+            name: SAMPLE_VALUES.get(type(rule._converters[name]).__name__, 'sprunki')
+            for name in rule.arguments
+        }
+        try:
+            url = adapter.build(rule.endpoint, values, method='GET')
+        except Exception:
+            continue
+        samples.append((rule.endpoint, values, url))
+    return samples
+
+
+def run_benchmark(mode, rounds):
+    url_map = build_map(mode)
+    adapter = url_map.bind('localhost')
+    samples = sample_requests(url_map)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, _, url in samples:
+            try:
+                adapter.match(url, method='GET')
+            except Exception:
+                pass
+    match_us = (time.perf_counter() - start) / (rounds * len(samples)) * 1e6
+
+    # 模拟语言选择器循环：每种语言生成一次首页和文章页链接
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for language in LANGUAGES:
+            code = language['code']
+            if code == 'en':
+                continue
+            adapter.build('base_url.index_lang', {'lang': code})
+            adapter.build('base_url.article_info_demo', {'lang': code, 'article_url': 'sprunki'})
+    build_us = (time.perf_counter() - start) / (rounds * (len(LANGUAGES) - 1) * 2) * 1e6
+
+    return len(samples), match_us, build_us
+
+
+def legacy_no_en_get_locale():
+    """优化前的实现：每次调用都拆分路径并写两条日志"""
+    path_parts = request.path.strip('/').split('/')
+    path_parts = [part for part in path_parts if part]
+    logger.info(path_parts)
+    lang = 'en'
+    if path_parts and path_parts[0] in app.config['BABEL_SUPPORTED_LOCALES']:
+        lang = path_parts[0]
+    logger.info(f"语言为{lang}")
+    if lang == 'en':
+        return None
+    return lang
+
+
+def run_locale_benchmark(requests_count=2000, calls_per_request=30):
+    """
+    每个请求的语言解析开销
+    Returns:
+        dict: {名称: µs/请求}
+    """
+    paths = ['/', '/zh/sprunki-phase-4.html', '/ja/', '/sprunki.html', '/de/about.html']
+    # 日志写到空设备，保留格式化和输出的开销但不刷屏
+    logger.remove()
+    handler = logger.add(open(os.devnull, 'w'), level='INFO')
+
+    results = {}
+    for name, func, hook in (('优化前', legacy_no_en_get_locale, None),
+                             ('优化后', no_en_get_locale, resolve_locale)):
+        elapsed = 0.0
+        for i in range(requests_count):
+            with app.test_request_context(paths[i % len(paths)]):
+                start = time.perf_counter()
+                if hook:
+                    hook()
+                for _ in range(calls_per_request):
+                    func()
+                elapsed += time.perf_counter() - start
+        results[name] = elapsed / requests_count * 1e6
+
+    logger.remove(handler)
+    logger.add(sys.stderr, level='WARNING')
+    return results
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"🔍 路由基准测试（{rounds} 轮）")
+    print("=" * 50)
+    for mode in ('regex', 'lang'):
+        count, match_us, build_us = run_benchmark(mode, rounds)
+        print(f"{mode:>5}: {count} 条规则 | 匹配 {match_us:.2f}µs/次 | url_for {build_us:.2f}µs/次")
+
+    print("\n🌐 语言解析基准测试")
+    print("=" * 50)
+    for name, cost in run_locale_benchmark().items():
+        print(f"{name}: {cost:.1f}µs/请求 (30 次调用)")
@@ -13,12 +13,13 @@ from apps.views.web_url import web_bp
 from get_app import app, get_locale, no_en_get_locale
 from apps.views.admin_urls import admin_bp
 from apps.views.base_urls import base_bp, warmup_cache
-from apps.models.article_model import 分类db, 模板db, 标签db, 状态db, 文章db, User, Picture
+from apps.models.article_model import 分类db, 图片任务db, 模板db, 标签db, 状态db, 文章db, User, Picture
 
 from setting import LANGUAGES
-from apps.models.article_view import ArticleView, CategoryView, AuthView, PictureModelView
+from apps.models.article_view import ArticleView, CategoryView, AuthView, ImageJobView, PictureModelView
 # 导入评论系统集成模块
 from apps.comment_integration import init_comment_system
+from apps.services.article_languages import article_languages
 
 def join_multiple_paths(base_url, *paths):
     for path in paths:
@@ -31,6 +32,14 @@ def join_multiple_paths(base_url, *paths):
     return base_url
 
 
+def language_urls(no_lang_path):
+    """当前页面各语言版本的地址（en 不带语言前缀），在片段缓存外计算后填入语言选择器和 hreflang"""
+    host_url = request.host_url
+    return {language['code']: join_multiple_paths(host_url, no_lang_path if language['code'] == 'en'
+                                                  else language['code'] + '/' + no_lang_path)
+            for language in LANGUAGES}
+
+
 # 多语言根据params参数来生成
 
 # 初始化app函数
@@ -79,7 +88,7 @@ def inject_locale():
         no_lang_path = '/'.join(path.split('/')[2:])
 
     return dict(get_locale=get_locale, no_en_lang=no_en_get_locale, languages=LANGUAGES, no_lang_path=no_lang_path,
-                urljoin=join_multiple_paths)
+                urljoin=join_multiple_paths, language_urls=language_urls, alternate_languages=article_languages.alternates)
 
 
 def create_super_admin():
@@ -95,23 +104,8 @@ def create_super_admin():
 @app.after_request
 def set_url(response):
 
-    # 高级性能优化：静态资源缓存策略
-    static_extensions = ('.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.woff', '.woff2', '.ttf', '.svg', '.webp')
-    if any(request.path.endswith(ext) for ext in static_extensions):
-        if 'v=' in request.url or 'version=' in request.url:
-            # 带版本号的资源，永久缓存
-            response.cache_control.max_age = 31536000  # 1年
-            response.cache_control.public = True
-            response.cache_control.immutable = True  # 不可变资源
-        else:
-            # 普通静态资源，短期缓存
-            response.cache_control.max_age = 86400  # 1天
-            response.cache_control.public = True
-        
-        # 设置压缩和缓存头
-        response.headers['Vary'] = 'Accept-Encoding'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        
+    # 静态文件的缓存头由 static_assets.StaticFiles 统一设置
+    if request.endpoint == 'static':
         return response
 
     # 高级HTML页面缓存策略
@@ -177,11 +171,22 @@ admin.add_view(AuthView(标签db))
 admin.add_view(AuthView(模板db))
 admin.add_view(AuthView(User))
 admin.add_view(PictureModelView(Picture))
+admin.add_view(ImageJobView(图片任务db, name='图片任务'))
 
 # 集成评论系统
 init_comment_system(app, admin)
 
-# 注意：静态文件路由已在 get_app.py 中定义
+# 预加载全部语言的翻译目录（gunicorn preload_app 下在 fork 前完成，worker 共享）
+from translation_preload import preload_translations
+preload_translations(app)
+
+# 预编译全部模板（优先加载磁盘字节码），worker 继承已编译的模板
+from template_cache import precompile_templates
+precompile_templates(app)
+
+# 小静态文件载入内存（fork 前完成，worker 共享）
+from static_assets import static_files
+static_files.preload()
 
 if __name__ == '__main__':
     # 7-15-15-44
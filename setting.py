@@ -11,14 +11,46 @@ from loguru import logger
 
 # ==========静态地址配置>>>>>>>>>>
 UPLOAD_FOLDER_ROOT = os.path.join('static', 'images')
+STATIC_MANIFEST = os.path.join('static', 'asset-manifest.json')  # 静态资源指纹清单（python static_assets.py 生成）
+STATIC_CACHE_MAX_FILE_SIZE = 256 * 1024  # 不超过该大小的静态文件缓存在内存
+STATIC_REVALIDATE_INTERVAL = 5  # 内存中的静态文件每隔多少秒检查一次 mtime
+STATIC_OFFLOAD = os.getenv('STATIC_OFFLOAD', '')  # 大文件交给前端代理发送: ''(不启用) / 'x-accel'(nginx) / 'x-sendfile'(apache等)
+STATIC_OFFLOAD_PREFIX = os.getenv('STATIC_OFFLOAD_PREFIX', '/_static_offload/')  # nginx internal location 前缀
 # ==========静态地址配置<<<<<<<<<<
 
+# ==========模板设置>>>>>>>>>>
+TEMPLATE_CACHE_DIR = os.getenv('TEMPLATE_CACHE_DIR', os.path.join('cache', 'jinja'))  # 模板字节码缓存目录
+# ==========模板设置<<<<<<<<<<
+
 # ++++++++++图床设置>>>>>>>>>>
 R2_ENDPOINT_URL = os.getenv('R2_ENDPOINT_URL', "")
 R2_BUCKET_NAME = os.getenv('R2_BUCKET_NAME', '')
 R2_ACCESS_KEY = os.getenv('R2_ACCESS_KEY', '')
 R2_SECRET_KEY = os.getenv('R2_SECRET_KEY', '')
 二级域名 = os.getenv('DOMAIN', "")
+IMAGE_LOCAL_STORAGE = os.getenv('IMAGE_LOCAL_STORAGE', '')  # 未配置 R2 时的本地图床目录（如 static/uploads），开发和测试用
+IMAGE_SETTINGS = {
+    'BUCKET': 'image',  # 存储桶，公开地址为 https://<R2_BUCKET_NAME>/image/<文件名>
+    'WIDTHS': (160, 320, 480, 640, 960),  # 响应式宽度阶梯（不放大，原图更窄时以原图宽度为最大一级）
+    'FORMATS': ('avif', 'webp'),  # 输出格式，优先级从高到低；Pillow 不支持的格式自动跳过
+    'QUALITY': {'avif': 55, 'webp': 75},  # 各格式的压缩质量
+    'FALLBACK_FORMAT': 'webp',  # image_url 和 <img> 使用的格式
+    'FALLBACK_WIDTH': 640,  # image_url 使用不超过该宽度的最大一级
+    'PLACEHOLDER_WIDTH': 16,  # 低清占位图（LQIP）宽度，内联为 base64 data URI
+    'PLACEHOLDER_QUALITY': 40,  # 低清占位图的 WebP 质量
+    'CARD_SIZES': '(max-width: 480px) 50vw, (max-width: 1024px) 33vw, 240px',  # 游戏卡片 <img sizes>
+    'MULTIPART_THRESHOLD': 8 * 1024 * 1024,  # 超过该大小分片上传
+    'MULTIPART_CHUNKSIZE': 8 * 1024 * 1024,  # 分片大小
+    'UPLOAD_RETRIES': 4,  # 上传失败重试次数（指数退避）
+    'RETRY_BACKOFF': 0.5,  # 第一次重试前等待的秒数，之后每次翻倍
+    'BATCH_PROCESSES': os.cpu_count() or 2,  # 批量上传时压缩图片的进程数
+    'BATCH_UPLOAD_THREADS': 8,  # 批量上传时的上传线程数
+    'PLACEHOLDER_URL': '/img/placeholder.svg',  # 后台处理完成前新文章使用的占位图
+    'JOB_WORKERS': 2,  # 后台图片处理线程数（每个 worker 进程）
+    'JOB_SPOOL_DIR': os.path.join('cache', 'image_jobs'),  # 待处理原图的暂存目录
+    'JOB_STALE_SECONDS': 600,  # 超过该时间未完成的任务视为已中断（worker 被回收等），可以重新执行
+    'JOB_SWEEP_INTERVAL': 300,  # 各 worker 检查已中断任务并自动重新排队的间隔（秒）
+}
 # ++++++++++图床设置<<<<<<<<<<
 
 # ++++++++++支付hook>>>>>>>>>>
@@ -125,7 +157,12 @@ COMMENT_SETTINGS = {
     'ENABLE_REPLIES': True,  # 是否允许回复
     'ENABLE_RATING': True,  # 是否启用评分
     'CACHE_TIMEOUT': 300,  # 缓存超时时间（秒）
-    'RATE_LIMIT': '10/minute',  # 频率限制
+    'RATE_LIMIT': '10/minute',  # 频率限制（评论）
+    'REPLY_RATE_LIMIT': '10/minute',  # 回复频率限制
+    'LIKE_RATE_LIMIT': '60/minute',  # 点赞频率限制
+    'RATE_LIMIT_SLOTS': 4096,  # 共享内存限流表槽位数
+    'LIKE_FLUSH_INTERVAL': 2,  # 点赞缓冲刷新间隔（秒）
+    'LIKE_BUFFER_MAX_KEYS': 10000,  # 点赞缓冲积压超过该数量时立即刷新
     'ALLOWED_TAGS': [],  # 允许的HTML标签
     'SPAM_KEYWORDS': [  # 垃圾评论关键词
         'spam', 'casino', 'viagra', 'cheap', 'money', 'free', 'click here',
@@ -141,6 +178,45 @@ COMMENT_SETTINGS = {
     'ENABLE_SPAM_DETECTION': False,  # 开发环境中暂时禁用垃圾检测
     'SPAM_CHAR_REPEAT_THRESHOLD': 0.2,  # 重复字符阈值（降低以便测试）
     'SPAM_KEYWORD_CHECK': False,  # 开发环境中暂时禁用关键词检查
+    'SPAM_SWEEP_BATCH_SIZE': 500,  # 后台垃圾清理每批处理的评论数
+    'SPAM_SWEEP_STALE_SECONDS': 120,  # 清理任务超过该时间无进度视为中断
 }
 # +++++++++++ 评论系统配置 <<<<<<<<<<
 
+# +++++++++++ 网站地图配置 >>>>>>>>>>
+SITEMAP_SETTINGS = {
+    'HOST': 'https://sprunkiphase4.net/',  # 网站地址（以 / 结尾）
+    'OUTPUT_DIR': os.path.join('static', 'sitemaps'),  # 分片目录
+    'INDEX_PATH': os.path.join('static', 'sitemap_index.xml'),  # 索引文件
+    'STATE_PATH': os.path.join('cache', 'sitemap_state.json'),  # 增量更新状态（水位线、分片信息），不对外提供
+    'IDS_PER_SHARD': 40000,  # 每个分片的 ids 区间跨度（协议上限 50,000 个URL）
+    'PUBLISHED_STATUS': '已发布',  # 进入网站地图的文章状态
+    'UPDATE_DELAY': 5,  # 文章变更后合并等待多少秒再增量更新
+    'CHECK_INTERVAL': 300,  # 请求触发后台增量检查的最小间隔（秒），兜底其它途径的修改
+    'MAX_AGE': 3600,  # /sitemap.xml 与分片的浏览器/CDN 缓存时间（秒）
+}
+# +++++++++++ 网站地图配置 <<<<<<<<<<
+
+# +++++++++++ llms.txt 配置 >>>>>>>>>>
+LLMS_SETTINGS = {
+    'OUTPUTS': {  # 模板名 -> 输出文件
+        'llms.txt': os.path.join('static', 'llms.txt'),
+        'llms-full.txt': os.path.join('static', 'llms-full.txt'),
+    },
+    'FRAGMENT_DIR': os.path.join('cache', 'llms'),  # 每种语言的文章列表片段
+    'STATE_PATH': os.path.join('cache', 'llms_state.json'),  # 增量更新状态（水位线、各语言文章数）
+    'SUMMARY_LENGTH': 160,  # llms.txt 中简介的最大长度，llms-full.txt 使用完整简介
+    'UPDATE_DELAY': 5,  # 文章变更后合并等待多少秒再增量更新
+    'CHECK_INTERVAL': 300,  # 请求触发后台增量检查的最小间隔（秒）
+    'MAX_AGE': 3600,  # 浏览器/CDN 缓存时间（秒）
+}
+# +++++++++++ llms.txt 配置 <<<<<<<<<<
+
+# +++++++++++ 订阅源配置 >>>>>>>>>>
+FEED_SETTINGS = {
+    'TITLE': 'Sprunki Phase 4',  # 频道标题（后面加语言名称）
+    'DESCRIPTION': 'Sprunki Phase 4 is the latest update in the music rhythm game, offering new beats, characters, and challenges.',
+    'LIMIT': 30,  # 条目数（只取已发布的文章，与首页列表分开缓存）
+    'MAX_AGE': 600,  # 浏览器/CDN 缓存时间（秒），也写入 <ttl>
+}
+# +++++++++++ 订阅源配置 <<<<<<<<<<
@@ -1,76 +1,310 @@
 # 新的网站地图
-from datetime import timedelta, datetime
+"""
+网站地图生成
+- 服务端游标按 ids 顺序流式读取已发布文章，内存占用与文章总数无关
+- 按 (语言, ids 区间) 分片，每片写成 static/sitemaps/sitemap-<语言>-<区间>.xml.gz
+  区间跨度 IDS_PER_SHARD 小于协议上限 50,000，单片 URL 数和大小都不会超限
+- 生成 static/sitemap_index.xml 引用全部分片
+- 每个文件先写临时文件再 os.replace，爬虫不会读到写了一半的文件；
+  分片全部写完后才替换索引，最后删除不再引用的旧分片
+- 增量更新：状态文件（默认 cache/sitemap_state.json）记录水位线（已处理到的 更新时间）和每个分片的信息，
+  只查询水位线之后变化的文章，只重写它们所在的分片（按 lang + ids 区间查询，走 ids 索引）
+
+用法: python sitemap.py [--full]
+"""
+
+import gzip
+import os
+import sys
+from datetime import datetime
+from xml.sax.saxutils import escape
 
-from loguru import logger
 import pytz
-from setting import mongo_uri
-from mongoengine import connect
+from loguru import logger
 
-connect(host=mongo_uri)
-from urllib.parse import urljoin
-from apps.models.article_model import 文章db
-from setting import languages
+import incremental
+from incremental import HOST, WATERMARK_MARGIN, build_lock, next_watermark, page_url, replace_with_gzip, to_utc
+from setting import SITEMAP_SETTINGS, LANGUAGES
 
-"""
-主页
-详情页
-    读取文章数据库
-"""
-urls = []
+OUTPUT_DIR = SITEMAP_SETTINGS['OUTPUT_DIR']
+INDEX_PATH = SITEMAP_SETTINGS['INDEX_PATH']
+IDS_PER_SHARD = SITEMAP_SETTINGS['IDS_PER_SHARD']
+PUBLISHED_STATUS = SITEMAP_SETTINGS['PUBLISHED_STATUS']
+STATE_PATH = SITEMAP_SETTINGS['STATE_PATH']
+# 后台增量更新的合并等待时间（秒），连续编辑只触发一次
+UPDATE_DELAY = SITEMAP_SETTINGS['UPDATE_DELAY']
 
-host = "https://sprunkiphase4.net/"
+# 首页没有发布时间，沿用原来的固定值
+HOME_LASTMOD = datetime(2024, 11, 29, 4, 29, 24, 610000, tzinfo=pytz.utc)
 
-for lang in languages:
-    if lang == "en":
-        lang = ""
-    else:
-        pass
-    url = urljoin(host, lang)
-    urls.append({
-        "url": url,
-        "lastmod": "2024-11-29T04:29:24.610000+00:00",
-        'priority': 1,
-    })
-for i in 文章db.objects(状态="已发布").only("lang", "article_url", "发布时间"):
-    lang = i.lang
-    if lang == "en":
-        lang = ""
-    article = i.article_url + ".html"
-    url = urljoin(host, lang)
-    url = urljoin(url + '/', article)
-    发布时间 = i.发布时间
-    logger.info(发布时间)
-    now = datetime.now()
-    three_days_ago = now - timedelta(days=3)
-
-    # 判断目标时间是否在近三天内
-    if three_days_ago <= 发布时间 <= now:
-        print("目标时间是近三天的时间")
-        priority = 1
+XML_HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+def shard_name(lang, bucket):
+    return f'sitemap-{lang}-{bucket}.xml.gz'
+
+
+def shard_key(lang, ids):
+    """文章所在的分片 (语言, ids 区间)"""
+    return lang, (ids or 0) // IDS_PER_SHARD
+
+
+def _utc(value):
+    return HOME_LASTMOD if value is None else to_utc(value)
+
+
+def _doc_lastmod(doc):
+    """文章的最后修改时间：发布时间和更新时间取较晚的"""
+    times = [_utc(doc[key]) for key in ('发布时间', '更新时间') if doc.get(key)]
+    return max(times) if times else None
+
+
+class ShardWriter:
+    """单个分片：边写边 gzip，写完后原子替换"""
+
+    def __init__(self, lang, bucket, output_dir=OUTPUT_DIR):
+        self.lang = lang
+        self.bucket = bucket
+        self.name = shard_name(lang, bucket)
+        self.path = os.path.join(output_dir, self.name)
+        self.tmp_path = f'{self.path}.tmp'
+        self.count = 0
+        self.lastmod = None
+        # mtime=0: 内容不变时压缩结果也不变
+        self._file = open(self.tmp_path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb', mtime=0)
+        self._gzip.write(XML_HEADER)
+        self._gzip.write(b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        if bucket == 0:
+            # 每种语言的首页放在第一个分片
+            self.add(page_url(lang), HOME_LASTMOD)
+
+    def add(self, loc, lastmod):
+        lastmod = _utc(lastmod)
+        self._gzip.write(
+            f'  <url>\n    <loc>{escape(loc)}</loc>\n    <lastmod>{lastmod.isoformat()}</lastmod>\n'
+            f'    <priority>1</priority>\n  </url>\n'.encode('utf-8'))
+        self.count += 1
+        if self.lastmod is None or lastmod > self.lastmod:
+            self.lastmod = lastmod
+
+    def close(self):
+        self._gzip.write(b'</urlset>\n')
+        self._gzip.close()
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._gzip.close()
+        self._file.close()
+        os.remove(self.tmp_path)
+
+
+def write_index(shards, index_path=INDEX_PATH):
+    """
+    原子写入 sitemap_index.xml 及其 .gz 副本
+    Args:
+        shards: {分片文件名: lastmod}
+    """
+    tmp_path = f'{index_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(XML_HEADER)
+        f.write(b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for name in sorted(shards):
+            f.write(f'  <sitemap>\n    <loc>{escape(HOST)}sitemaps/{name}</loc>\n'
+                    f'    <lastmod>{shards[name].isoformat()}</lastmod>\n  </sitemap>\n'.encode('utf-8'))
+        f.write(b'</sitemapindex>\n')
+    replace_with_gzip(tmp_path, index_path)
+
+
+def load_state(state_path=STATE_PATH):
+    """读取增量状态，不存在时返回 None"""
+    state = incremental.load_state(state_path)
+    if state is not None:
+        for item in state['shards'].values():
+            item['lastmod'] = datetime.fromisoformat(item['lastmod'])
+    return state
+
+
+def save_state(state, state_path=STATE_PATH):
+    """原子写入增量状态"""
+    incremental.save_state({
+        'watermark': state['watermark'],
+        'shards': {
+            name: {**item, 'lastmod': item['lastmod'].isoformat()}
+            for name, item in state['shards'].items()
+        }
+    }, state_path)
+
+
+def _remove_stale_shards(keep, output_dir=OUTPUT_DIR):
+    for name in os.listdir(output_dir):
+        if name.startswith('sitemap-') and name not in keep:
+            os.remove(os.path.join(output_dir, name))
+
+
+def published_articles(query=None, batch_size=1000):
+    """
+    按 ids 顺序流式读取已发布文章（服务端游标，只取需要的字段）
+    """
+    from apps.models.article_model import 文章db
+
+    criteria = {'状态': PUBLISHED_STATUS}
+    criteria.update(query or {})
+    return 文章db._get_collection().find(
+        criteria,
+        projection={'_id': 0, 'lang': 1, 'article_url': 1, 'ids': 1, '发布时间': 1, '更新时间': 1},
+        sort=[('ids', 1)],
+        batch_size=batch_size
+    )
+
+
+def build_sitemaps(output_dir=OUTPUT_DIR, index_path=INDEX_PATH, state_path=STATE_PATH):
+    """
+    全量生成分片和索引，并保存增量状态
+    Returns:
+        dict: {分片文件名: {'lang', 'bucket', 'count': URL 数, 'lastmod': 最后修改时间}}
+    """
+    with build_lock(state_path):
+        return _build_sitemaps(output_dir, index_path, state_path)
+
+
+def _build_sitemaps(output_dir, index_path, state_path):
+    os.makedirs(output_dir, exist_ok=True)
+    start_time = datetime.now(pytz.utc)
+    # 游标按 ids 递增，同一语言进入下一个区间时前一个分片就可以关闭，同时打开的分片最多每种语言一个
+    open_writers = {}
+    finished = {}
+
+    def finish(writer):
+        writer.close()
+        finished[writer.name] = {'lang': writer.lang, 'bucket': writer.bucket,
+                                 'count': writer.count, 'lastmod': writer.lastmod}
+
+    try:
+        for language in LANGUAGES:
+            open_writers[language['code']] = ShardWriter(language['code'], 0, output_dir)
+
+        for doc in published_articles():
+            lang, article_url = doc.get('lang'), doc.get('article_url')
+            if not lang or not article_url:
+                continue
+            lang, bucket = shard_key(lang, doc.get('ids'))
+            writer = open_writers.get(lang)
+            if writer is None or writer.bucket != bucket:
+                if writer is not None:
+                    finish(writer)
+                writer = open_writers[lang] = ShardWriter(lang, bucket, output_dir)
+            writer.add(page_url(lang, article_url), _doc_lastmod(doc))
+
+        for writer in list(open_writers.values()):
+            finish(writer)
+        open_writers.clear()
+    finally:
+        for writer in open_writers.values():
+            if writer.name not in finished:
+                writer.abort()
+
+    write_index({name: item['lastmod'] for name, item in finished.items()}, index_path)
+    _remove_stale_shards(finished, output_dir)
+    save_state({'watermark': start_time - WATERMARK_MARGIN, 'shards': finished}, state_path)
+
+    total = sum(item['count'] for item in finished.values())
+    logger.info(f"🗺️ 网站地图生成完成: {len(finished)} 个分片，{total} 个URL，"
+                f"耗时 {(datetime.now(pytz.utc) - start_time).total_seconds():.2f}s")
+    return finished
+
+
+def _rewrite_shard(lang, bucket, output_dir):
+    """按 lang + ids 区间重新查询并重写一个分片，返回分片信息（区间内没有文章时返回 None）"""
+    query = {'lang': lang, 'ids': {'$gte': bucket * IDS_PER_SHARD, '$lt': (bucket + 1) * IDS_PER_SHARD}}
+    if bucket == 0:
+        # ids 为空的旧数据也归在第一个分片
+        query = {'lang': lang, '$or': [{'ids': query['ids']}, {'ids': None}]}
+    writer = ShardWriter(lang, bucket, output_dir)
+    try:
+        for doc in published_articles(query):
+            if doc.get('article_url'):
+                writer.add(page_url(lang, doc['article_url']), _doc_lastmod(doc))
+    except Exception:
+        writer.abort()
+        raise
+    if writer.count == 0:
+        writer.abort()
+        return None
+    writer.close()
+    return {'lang': lang, 'bucket': bucket, 'count': writer.count, 'lastmod': writer.lastmod}
+
+
+def update_sitemaps(changed=(), output_dir=OUTPUT_DIR, index_path=INDEX_PATH, state_path=STATE_PATH):
+    """
+    增量更新：只重写水位线之后变化的文章所在的分片
+    Args:
+        changed: 额外需要重写的分片 [(语言, ids)]，用于删除文章、修改语言或 ids 时的旧位置
+    Returns:
+        list: 重写的分片文件名
+    """
+    with build_lock(state_path):
+        state = load_state(state_path)
+        if state is None or not os.path.exists(index_path):
+            _build_sitemaps(output_dir, index_path, state_path)
+            return ['*']
+
+        from apps.models.article_model import 文章db
+
+        start_time = datetime.now(pytz.utc)
+        affected = {shard_key(lang, ids) for lang, ids in changed if lang}
+        watermark = state['watermark']
+        cursor = 文章db._get_collection().find(
+            {'更新时间': {'$gt': watermark}},
+            projection={'_id': 0, 'lang': 1, 'ids': 1, '更新时间': 1}
+        )
+        for doc in cursor:
+            if doc.get('lang'):
+                affected.add(shard_key(doc['lang'], doc.get('ids')))
+            watermark = max(watermark, _utc(doc['更新时间']))
+        if not affected:
+            return []
+
+        rewritten = []
+        for lang, bucket in sorted(affected):
+            name = shard_name(lang, bucket)
+            info = _rewrite_shard(lang, bucket, output_dir)
+            if info is None:
+                state['shards'].pop(name, None)
+            else:
+                state['shards'][name] = info
+            rewritten.append(name)
+
+        write_index({name: item['lastmod'] for name, item in state['shards'].items()}, index_path)
+        _remove_stale_shards(state['shards'], output_dir)
+        state['watermark'] = next_watermark(state['watermark'], watermark, start_time)
+        save_state(state, state_path)
+        logger.info(f"🗺️ 网站地图增量更新: 重写 {len(rewritten)} 个分片 {rewritten}，"
+                    f"耗时 {(datetime.now(pytz.utc) - start_time).total_seconds() * 1000:.0f}ms")
+        return rewritten
+
+
+_pending_update = incremental.DebouncedUpdate('网站地图', UPDATE_DELAY, update_sitemaps)
+
+
+def schedule_sitemap_update(lang=None, ids=None):
+    """
+    文章变更后调用：记录需要重写的分片，稍后在后台线程中合并执行一次增量更新
+    Args:
+        lang, ids: 文章原来的位置（删除文章或修改语言 / ids 时传入）
+    """
+    _pending_update.schedule((lang, ids) if lang else None)
+
+
+if __name__ == '__main__':
+    from mongoengine import connect
+    from setting import mongo_uri
+
+    connect(host=mongo_uri)
+    if '--full' in sys.argv or load_state() is None:
+        shards = build_sitemaps()
+        print(f"✅ {INDEX_PATH}: {len(shards)} 个分片，{sum(item['count'] for item in shards.values())} 个URL")
     else:
-        print("目标时间不是近三天的时间")
-        priority = 0.8
-
-    utc_time = 发布时间.astimezone(pytz.utc)
-    utc_str = utc_time.isoformat()
-    logger.info(utc_time)
-    urls.append({
-        "url": url,
-        "lastmod": utc_str,
-        'priority': 1,
-    })
-
-print(len(urls))
-for url in urls:
-    print(url)
-with open('static/sitemap.xml', 'wb') as f:
-    f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
-    f.write(b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-
-    for url in urls:
-        f.write(b'  <url>\n')
-        f.write(f'    <loc>{url["url"]}</loc>\n'.encode('utf-8'))
-        f.write(f'    <lastmod>{url["lastmod"]}</lastmod>\n'.encode('utf-8'))
-        f.write(f'    <priority>{url["priority"]}</priority>\n'.encode('utf-8'))
-        f.write(b'  </url>\n')
-    f.write(b'</urlset>\n')
\ No newline at end of file
+        rewritten = update_sitemaps()
+        print(f"✅ 增量更新: 重写 {len(rewritten)} 个分片")
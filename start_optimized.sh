@@ -10,6 +10,14 @@ if lsof -Pi :9028 -sTCP:LISTEN -t >/dev/null ; then
     exit 1
 fi
 
+# 生成静态资源指纹清单和 .gz/.br 压缩副本
+echo "🔖 生成静态资源指纹..."
+python static_assets.py
+
+# 预编译模板到字节码缓存
+echo "📄 预编译模板..."
+python template_cache.py
+
 # 使用Gunicorn启动
 echo "✅ 使用Gunicorn启动应用..."
 gunicorn run:app -c gunicorn_config.py
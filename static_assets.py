@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+静态资源指纹
+构建时对 static/ 下（含 Vite 输出的 dist/）每个文件计算内容哈希，生成
+asset-manifest.json: {"files": {"style/style.css": "style/style.3f2a9c1b.css"}, "stats": {"style/style.css": [大小, mtime_ns]}}。
+启动时逐个 stat 校验清单：大小和 mtime 都没变的文件沿用清单里的哈希，其余重新计算，
+部署时忘了重新生成清单也不会让旧的指纹地址返回新内容。
+运行时 url_for('static', filename=...) 自动输出带哈希的文件名，服务端再把带哈希的
+文件名映射回原文件，并返回一年的 immutable 缓存头；内容变化后哈希变化，客户端自动拿新文件。
+
+同时为可压缩的文件预先生成 .gz / .br 副本，请求时按 Accept-Encoding 直接发送压缩文件，
+不再由 flask-compress 每次请求现压缩。
+
+StaticFiles 是唯一的静态文件出口：小文件和压缩副本常驻内存，按间隔用 mtime 重新校验。
+大文件可以交给前端代理发送（STATIC_OFFLOAD），sync worker 立即释放。
+nginx 配置示例（STATIC_OFFLOAD=x-accel）:
+
+    location /_static_offload/ {
+        internal;
+        alias /path/to/project/static/;
+        # 预压缩副本需要带上应用给出的编码（Content-Type、Cache-Control 由 nginx 自动沿用）
+        add_header Content-Encoding $upstream_http_content_encoding;
+        add_header Vary Accept-Encoding;
+    }
+
+用法: python static_assets.py   （部署时生成清单和压缩副本）
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import time
+
+from flask import abort, current_app, request, send_file
+from loguru import logger
+from werkzeug.security import safe_join
+from werkzeug.urls import url_quote
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+from setting import (STATIC_MANIFEST, STATIC_CACHE_MAX_FILE_SIZE, STATIC_REVALIDATE_INTERVAL,
+                     STATIC_OFFLOAD, STATIC_OFFLOAD_PREFIX)
+
+# 指纹资源缓存时间（1年）
+IMMUTABLE_MAX_AGE = 31536000
+
+# 需要固定地址的文件：Service Worker、PWA 清单、给爬虫的文本文件
+EXCLUDED_FILES = {
+    'pwa-sw.js', 'manifest.json', 'robots.txt', 'sitemap.xml', 'sitemap_index.xml', 'ads.txt',
+    'llms.txt', 'llms-full.txt', os.path.basename(STATIC_MANIFEST)
+}
+EXCLUDED_EXTENSIONS = ('.html', '.gz', '.br', '.map')
+
+# 需要预压缩的文件类型（图片等已压缩的格式不处理）
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.txt', '.xml', '.ico', '.map')
+# 小于该大小的文件压缩收益不明显
+MIN_COMPRESS_SIZE = 500
+# 优先级从高到低: (Accept-Encoding 中的名称, 文件后缀)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# 非指纹地址的缓存时间（秒），未列出的使用 SEND_FILE_MAX_AGE_DEFAULT
+MAX_AGE_RULES = (
+    ('dist/', 31536000),        # 构建产物 1年
+    ('style/', 604800),         # 7天
+    ('js/', 604800),
+    ('css/', 604800),
+    ('images/', 2592000),       # 30天
+    ('favicon.ico', 2592000),
+)
+
+
+def _file_hash(path, length=8):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def _fingerprinted_name(filename, file_hash):
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{file_hash}{ext}'
+
+
+def build_manifest(static_folder='static', previous=None):
+    """
+    计算 static/ 下全部文件的指纹
+    Args:
+        static_folder: 静态文件目录
+        previous: 之前的清单，大小和 mtime 都没变的文件沿用其中的哈希
+    Returns:
+        dict: {'files': 原文件名 -> 带哈希的文件名, 'stats': 原文件名 -> [大小, mtime_ns]}（均为相对 static/ 的 / 分隔路径）
+    """
+    previous_files = (previous or {}).get('files', {})
+    previous_stats = (previous or {}).get('stats', {})
+    files, stats = {}, {}
+    for root, dirs, names in os.walk(static_folder):
+        dirs.sort()
+        for name in sorted(names):
+            if name in EXCLUDED_FILES or name.endswith(EXCLUDED_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stat = os.stat(path)
+            stats[filename] = [stat.st_size, stat.st_mtime_ns]
+            if filename in previous_files and previous_stats.get(filename) == stats[filename]:
+                files[filename] = previous_files[filename]
+            else:
+                files[filename] = _fingerprinted_name(filename, _file_hash(path))
+    return {'files': files, 'stats': stats}
+
+
+def read_manifest(manifest_path=STATIC_MANIFEST):
+    """读取清单，不存在或格式不对时返回 None"""
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest.get('files'), dict) or not isinstance(manifest.get('stats'), dict):
+        return None
+    return manifest
+
+
+def write_manifest(static_folder='static', manifest_path=STATIC_MANIFEST, manifest=None):
+    """生成（或写入给定的）清单并原子写入"""
+    if manifest is None:
+        manifest = build_manifest(static_folder)
+    tmp_path = f'{manifest_path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def _write_atomic(path, data, mtime):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    # 与原文件同一 mtime，原文件修改后能识别出副本已过期
+    os.utime(tmp_path, (mtime, mtime))
+    os.replace(tmp_path, path)
+
+
+def precompress(static_folder='static'):
+    """
+    为可压缩的文件生成 .gz / .br 副本（原文件未变化时跳过）
+    Args:
+        static_folder: 静态文件目录
+    Returns:
+        dict: 各编码生成的文件数
+    """
+    written = {'gzip': 0, 'br': 0}
+    for root, dirs, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            source_stat = os.stat(path)
+            if source_stat.st_size < MIN_COMPRESS_SIZE:
+                continue
+
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding == 'br' and not HAS_BROTLI:
+                    continue
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime == source_stat.st_mtime:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                if encoding == 'br':
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                # 压缩后反而更大的不保留
+                if len(compressed) >= len(data):
+                    continue
+                _write_atomic(target, compressed, source_stat.st_mtime)
+                written[encoding] += 1
+    return written
+
+
+class AssetManifest:
+    """
+    运行时的指纹映射
+    - url_for('static') 时把原文件名替换为带哈希的文件名
+    - 请求带哈希的文件名时映射回原文件
+    """
+
+    def __init__(self):
+        self.static_folder = 'static'
+        self._files = {}
+        self._reverse = {}
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.load()
+        app.url_defaults(self._url_defaults)
+
+    def load(self):
+        """读取构建好的清单并逐个校验，没有清单或文件有变化时现算（并更新清单文件）"""
+        start_time = time.time()
+        previous = read_manifest()
+        manifest = build_manifest(self.static_folder, previous)
+        files = manifest['files']
+        if previous is None:
+            source = '实时计算'
+        elif manifest == previous:
+            source = STATIC_MANIFEST
+        else:
+            changed = sum(1 for filename, hashed in files.items() if previous['files'].get(filename) != hashed)
+            source = f'{STATIC_MANIFEST} 已过期，{changed} 个文件重新计算'
+            logger.warning("静态资源清单与文件不一致（部署时未运行 python static_assets.py？），已按文件内容重新计算")
+        if manifest != previous:
+            try:
+                write_manifest(self.static_folder, manifest=manifest)
+            except OSError as e:
+                logger.warning(f"静态资源清单写入失败: {e}")
+        self._files = files
+        self._reverse = {hashed: filename for filename, hashed in files.items()}
+        logger.info(f"静态资源指纹已加载（{source}）: {len(files)} 个文件，"
+                    f"耗时 {(time.time() - start_time) * 1000:.1f}ms")
+
+    def _url_defaults(self, endpoint, values):
+        # 调试模式下文件随时在改，不使用指纹
+        if endpoint != 'static' or current_app.debug:
+            return
+        filename = values.get('filename')
+        if filename:
+            filename = os.path.normpath(filename).replace(os.sep, '/')
+            values['filename'] = self._files.get(filename, filename)
+
+    def resolve(self, filename):
+        """
+        带哈希的文件名映射回原文件
+        Returns:
+            tuple: (原文件名, 是否为指纹地址)
+        """
+        original = self._reverse.get(filename)
+        if original is None:
+            return filename, False
+        return original, True
+
+    def get_stats(self):
+        return {'files': len(self._files), 'manifest': STATIC_MANIFEST}
+
+
+# 全局指纹映射
+asset_manifest = AssetManifest()
+
+
+class _Variant:
+    """文件的一个编码版本（原文件或 .gz/.br 副本）"""
+    __slots__ = ('path', 'size', 'etag', 'data')
+
+    def __init__(self, path, size, etag, data=None):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.data = data
+
+
+class _StaticFile:
+    __slots__ = ('path', 'mtime', 'size', 'mimetype', 'max_age', 'variants', 'checked_at')
+
+
+class StaticFiles:
+    """
+    统一的静态文件服务
+    - 接管 Flask 的 static 端点（static_url_path="/"，覆盖 /style、/js、/css、/dist、/images 等全部目录）
+    - 小文件连同预压缩副本一起缓存在内存，ETag、类型、缓存头预先算好
+    - 每隔 revalidate_interval 秒才检查一次 mtime，期间请求不访问文件系统
+    - 大文件只缓存元数据，由 send_file 发送，或在 offload 模式下只返回
+      X-Accel-Redirect / X-Sendfile 头，由前端代理发送文件内容
+    """
+
+    def __init__(self, max_file_size=262144, max_total_size=33554432, revalidate_interval=5,
+                 offload='', offload_prefix='/_static_offload/'):
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.revalidate_interval = revalidate_interval
+        self.offload = offload
+        self.offload_prefix = offload_prefix
+        self.static_folder = 'static'
+        self.default_max_age = 86400
+        self._files = {}
+        self._memory = 0
+        self._stats = {'hits': 0, 'reloads': 0, 'revalidations': 0, 'not_found': 0, 'offloaded': 0}
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.default_max_age = app.config['SEND_FILE_MAX_AGE_DEFAULT']
+        app.view_functions['static'] = self.serve
+
+    def _max_age(self, filename):
+        for prefix, max_age in MAX_AGE_RULES:
+            if filename.startswith(prefix):
+                return max_age
+        return self.default_max_age
+
+    def _read_variant(self, path, size):
+        """读取一个版本，小文件放进内存，ETag 用内容哈希"""
+        if size <= self.max_file_size and self._memory + size <= self.max_total_size:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self._memory += len(data)
+            return _Variant(path, len(data), hashlib.md5(data).hexdigest()[:16], data)
+        return _Variant(path, size, f'{int(os.stat(path).st_mtime)}-{size}')
+
+    def _release(self, entry):
+        for variant in entry.variants.values():
+            if variant.data is not None:
+                self._memory -= variant.size
+
+    def _load(self, filename):
+        path = safe_join(self.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        source_stat = os.stat(path)
+        entry = _StaticFile()
+        entry.path = path
+        entry.mtime = source_stat.st_mtime
+        entry.size = source_stat.st_size
+        mimetype, file_encoding = mimetypes.guess_type(filename)
+        # 本身就是压缩文件（如 sitemap 分片 .xml.gz），按 gzip 文件发送
+        if file_encoding == 'gzip':
+            mimetype = 'application/gzip'
+        entry.mimetype = mimetype or 'application/octet-stream'
+        entry.max_age = self._max_age(filename)
+        entry.variants = {None: self._read_variant(path, source_stat.st_size)}
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            for encoding, suffix in ENCODINGS:
+                try:
+                    variant_stat = os.stat(path + suffix)
+                except OSError:
+                    continue
+                # 副本与原文件 mtime 不一致说明原文件改过而副本没重新生成，不能使用
+                if variant_stat.st_mtime == source_stat.st_mtime:
+                    entry.variants[encoding] = self._read_variant(path + suffix, variant_stat.st_size)
+        entry.checked_at = time.time()
+        return entry
+
+    def get(self, filename):
+        """
+        获取文件元数据（及内存中的内容），按间隔检查 mtime
+        Returns:
+            _StaticFile: 文件不存在时返回 None
+        """
+        entry = self._files.get(filename)
+        now = time.time()
+        if entry is not None:
+            if now - entry.checked_at < self.revalidate_interval:
+                self._stats['hits'] += 1
+                return entry
+            self._stats['revalidations'] += 1
+            try:
+                source_stat = os.stat(entry.path)
+                if source_stat.st_mtime == entry.mtime and source_stat.st_size == entry.size:
+                    entry.checked_at = now
+                    return entry
+            except OSError:
+                pass
+            self._release(entry)
+            self._files.pop(filename, None)
+
+        entry = self._load(filename)
+        if entry is None:
+            self._stats['not_found'] += 1
+            return None
+        self._stats['reloads'] += 1
+        self._files[filename] = entry
+        return entry
+
+    def preload(self, skip_dirs=('images',)):
+        """
+        启动时（gunicorn fork 前）把小文件读进内存，worker 共享
+        上传图片目录默认跳过，按需加载
+        """
+        start_time = time.time()
+        for root, dirs, files in os.walk(self.static_folder):
+            if root == self.static_folder:
+                dirs[:] = [name for name in dirs if name not in skip_dirs]
+            for name in files:
+                if name.endswith(('.gz', '.br', '.tmp')):
+                    continue
+                path = os.path.join(root, name)
+                if os.path.getsize(path) <= self.max_file_size:
+                    self.get(os.path.relpath(path, self.static_folder).replace(os.sep, '/'))
+        logger.info(f"📦 静态文件已载入内存: {len(self._files)} 个，{self._memory / 1024:.0f}KB，"
+                    f"耗时 {(time.time() - start_time) * 1000:.1f}ms")
+
+    def serve(self, filename):
+        """static 端点：指纹地址映射、编码协商、条件请求"""
+        filename, fingerprinted = asset_manifest.resolve(filename)
+        entry = self.get(filename)
+        if entry is None:
+            abort(404)
+
+        encoding = None
+        if len(entry.variants) > 1:
+            accept = request.accept_encodings
+            for name, _ in ENCODINGS:
+                if name in entry.variants and accept[name]:
+                    encoding = name
+                    break
+        variant = entry.variants[encoding]
+
+        if variant.data is not None:
+            response = current_app.response_class(variant.data, mimetype=entry.mimetype)
+            response.set_etag(variant.etag)
+            response.last_modified = entry.mtime
+            response.make_conditional(request, accept_ranges=True, complete_length=variant.size)
+        elif self.offload:
+            response = self._offload_response(entry, variant)
+        else:
+            response = send_file(variant.path, mimetype=entry.mimetype, etag=variant.etag,
+                                 last_modified=entry.mtime, conditional=True)
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            response.vary.add('Accept-Encoding')
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.cache_control.public = True
+        if fingerprinted:
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = entry.max_age
+        return response
+
+    def _offload_response(self, entry, variant):
+        """只返回头部，文件内容由前端代理发送（304 由应用直接回答）"""
+        response = current_app.response_class(mimetype=entry.mimetype)
+        response.set_etag(variant.etag)
+        response.last_modified = entry.mtime
+        response.make_conditional(request)
+        # 代理不看状态码，只要有 offload 头就会发送整个文件，304 等响应不能带这个头
+        if response.status_code != 200:
+            return response
+        if self.offload == 'x-accel':
+            relative = os.path.relpath(variant.path, self.static_folder).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = self.offload_prefix + url_quote(relative)
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(variant.path)
+        # 长度由代理按实际文件给出
+        response.automatically_set_content_length = False
+        self._stats['offloaded'] += 1
+        return response
+
+    def get_stats(self):
+        return {
+            'offload': self.offload or None,
+            'files': len(self._files),
+            'memory_kb': round(self._memory / 1024, 1),
+            **self._stats
+        }
+
+
+# 全局静态文件服务
+static_files = StaticFiles(
+    max_file_size=STATIC_CACHE_MAX_FILE_SIZE,
+    revalidate_interval=STATIC_REVALIDATE_INTERVAL,
+    offload=STATIC_OFFLOAD,
+    offload_prefix=STATIC_OFFLOAD_PREFIX
+)
+
+
+if __name__ == "__main__":
+    manifest = write_manifest()
+    print(f"✅ 已生成 {STATIC_MANIFEST}: {len(manifest['files'])} 个文件")
+    written = precompress()
+    print(f"✅ 预压缩完成: gzip {written['gzip']} 个, br {written['br']} 个"
+          + ('' if HAS_BROTLI else '（未安装 brotli，跳过 br）'))
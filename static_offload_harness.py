@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+静态文件 offload 验证脚本
+在本机启动:
+- 一个单线程的 WSGI 服务（模拟 gunicorn 的一个 sync worker）
+- 一个兼容 nginx 行为的前端代理：X-Accel-Redirect 按 internal location 映射到 static/，
+  X-Sendfile 按绝对路径发送；普通响应按客户端速度边读边转发（proxy_buffering off）
+然后用一个慢速客户端下载一个临时生成的大文件，同时发起一个普通请求，对比:
+- worker 被占用的时间
+- 慢速下载期间另一个请求的等待时间
+- 带 If-None-Match 的重复请求经过代理后是 304 且没有响应体（offload 头不能出现在 304 上）
+
+用法: python static_offload_harness.py [下载速度KB/s]
+"""
+
+import http.client
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from loguru import logger
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+logger.remove()
+logger.add(sys.stderr, level='WARNING')
+
+from get_app import app  # noqa: E402
+from static_assets import static_files  # noqa: E402
+
+# 让 worker 和代理之间的 socket 缓冲很小，worker 的写入速度与客户端下载速度一致
+SOCKET_BUFFER = 8192
+# 临时生成在 static/ 下的测试文件（大于内存缓存上限，走 send_file / offload）
+TEST_FILE = 'offload-harness.txt'
+TEST_FILE_SIZE = 900 * 1024
+# nginx 对 X-Accel-Redirect 响应沿用的上游头（另加示例配置里 add_header 的两个）
+ACCEL_PASS_HEADERS = ('Content-Type', 'Cache-Control', 'Expires', 'Set-Cookie',
+                      'Content-Disposition', 'Accept-Ranges', 'Content-Encoding', 'Vary')
+
+busy_log = []
+
+
+class BusyMeter:
+    """记录每个请求占用 worker 的时间（从开始处理到响应体写完）"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        path = environ.get('PATH_INFO')
+        body = self.wsgi_app(environ, start_response)
+        try:
+            yield from body
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            busy_log.append((path, time.perf_counter() - start))
+
+
+class SmallBufferHandler(WSGIRequestHandler):
+    def setup(self):
+        self.request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+        super().setup()
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """nginx 行为的最小子集"""
+    protocol_version = 'HTTP/1.1'
+    backend_port = None
+    static_root = None
+
+    def setup(self):
+        self.request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        upstream = http.client.HTTPConnection('127.0.0.1', self.backend_port)
+        upstream.sock = socket.create_connection(('127.0.0.1', self.backend_port))
+        upstream.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+        headers = {name: value for name, value in self.headers.items()
+                   if name.lower() in ('accept-encoding', 'if-none-match', 'if-modified-since', 'range')}
+        upstream.request('GET', self.path, headers=headers)
+        response = upstream.getresponse()
+
+        accel = response.getheader('X-Accel-Redirect')
+        sendfile = response.getheader('X-Sendfile')
+        if accel or sendfile:
+            response.read()
+            upstream.close()
+            if accel:
+                prefix = static_files.offload_prefix
+                if not accel.startswith(prefix):
+                    return self._send_error(500)
+                path = os.path.join(self.static_root, unquote(accel[len(prefix):]))
+            else:
+                path = sendfile
+            path = os.path.realpath(path)
+            if not path.startswith(self.static_root) or not os.path.isfile(path):
+                return self._send_error(404)
+            self.send_response(200)
+            for name in ACCEL_PASS_HEADERS:
+                value = response.getheader(name)
+                if value:
+                    self.send_header(name, value)
+            self.send_header('Content-Length', str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(16384), b''):
+                    self.wfile.write(chunk)
+            return
+
+        self.send_response(response.status)
+        for name, value in response.getheaders():
+            if name.lower() not in ('connection', 'transfer-encoding'):
+                self.send_header(name, value)
+        self.end_headers()
+        for chunk in iter(lambda: response.read(16384), b''):
+            self.wfile.write(chunk)
+        upstream.close()
+
+    def _send_error(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def slow_download(port, path, rate_kb, result):
+    """按限定速度读取响应（模拟慢速客户端）"""
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    sock.sendall(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept-Encoding: identity\r\n'
+                 f'Connection: close\r\n\r\n'.encode())
+    start = time.perf_counter()
+    data = b''
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        # 按累计字节数控制节奏，总耗时约为 大小 / 速度
+        delay = start + len(data) / (rate_kb * 1024) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sock.close()
+    header, _, body = data.partition(b'\r\n\r\n')
+    result['elapsed'] = time.perf_counter() - start
+    result['headers'] = header.decode(errors='replace')
+    result['body'] = body
+
+
+def timed_get(port, path):
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status, time.perf_counter() - start
+
+
+def conditional_get(port, path, etag):
+    """带 If-None-Match 的请求，返回 (状态码, 响应体长度)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', path, headers={'If-None-Match': etag, 'Accept-Encoding': 'identity'})
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response.status, len(body)
+
+
+def run_scenario(mode, proxy_port, rate_kb):
+    static_files.offload = mode
+    busy_log.clear()
+    result = {}
+    downloader = threading.Thread(target=slow_download, args=(proxy_port, f'/{TEST_FILE}', rate_kb, result))
+    downloader.start()
+    time.sleep(0.3)
+    status, latency = timed_get(proxy_port, '/robots.txt')
+    downloader.join()
+
+    with open(os.path.join(app.static_folder, TEST_FILE), 'rb') as f:
+        expected = f.read()
+    busy = dict(busy_log).get(f'/{TEST_FILE}', 0.0)
+    # 代理不转发 offload 响应的 ETag，直接向应用取
+    conn = http.client.HTTPConnection('127.0.0.1', ProxyHandler.backend_port, timeout=60)
+    conn.request('GET', f'/{TEST_FILE}', headers={'Accept-Encoding': 'identity'})
+    etag = conn.getresponse().getheader('ETag')
+    conn.close()
+    revalidate_status, revalidate_size = conditional_get(proxy_port, f'/{TEST_FILE}', etag)
+    return {
+        'mode': mode or 'off',
+        'download_s': result['elapsed'],
+        'worker_busy_s': busy,
+        'other_request_s': latency,
+        'other_status': status,
+        'body_ok': result['body'] == expected,
+        'revalidate': (revalidate_status, revalidate_size),
+    }
+
+
+def main():
+    rate_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+
+    test_path = os.path.join(app.static_folder, TEST_FILE)
+    with open(test_path, 'wb') as f:
+        f.write(os.urandom(TEST_FILE_SIZE // 2).hex().encode())
+
+    backend = make_server('127.0.0.1', 0, BusyMeter(app), threaded=False, request_handler=SmallBufferHandler)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+
+    ProxyHandler.backend_port = backend.server_port
+    ProxyHandler.static_root = os.path.realpath(app.static_folder)
+    proxy = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+
+    print(f"🔍 静态文件 offload 验证（慢速客户端 {rate_kb}KB/s 下载 {TEST_FILE_SIZE // 1024}KB 文件，单 worker）")
+    print("=" * 72)
+    try:
+        results = [run_scenario(mode, proxy.server_port, rate_kb) for mode in ('', 'x-accel', 'x-sendfile')]
+    finally:
+        os.remove(test_path)
+    for item in results:
+        print(f"{item['mode']:>10}: 下载 {item['download_s']:.2f}s | worker 占用 {item['worker_busy_s'] * 1000:.1f}ms"
+              f" | 同时的其它请求 {item['other_request_s'] * 1000:.1f}ms ({item['other_status']})"
+              f" | 内容{'一致' if item['body_ok'] else '不一致'}"
+              f" | 重新验证 {item['revalidate'][0]}（{item['revalidate'][1]} 字节）")
+
+    ok = all(item['body_ok'] and item['revalidate'] == (304, 0) for item in results) and all(
+        item['worker_busy_s'] < 0.2 and item['other_request_s'] < 0.2 for item in results[1:])
+    print("✅ offload 模式下 worker 立即释放" if ok else "❌ offload 验证未通过")
+    backend.shutdown()
+    proxy.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+批量上传图片
+- 读文件、计算内容哈希、查重在任务线程中完成（每张图片只读一次）
+- 解码、缩放、编码（含低清占位图）在进程池中并行（不受 GIL 限制）
+- 各版本的上传在独立的线程池中并行，大文件自动分片，临时错误按指数退避重试
+- 同时处理中的图片数有上限，内存占用不随批量大小增长
+- 每完成一张图片回调一次进度
+
+用法: python -m tool.batch_upload <文件或目录>... [--processes N] [--threads N] [--report 结果.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from loguru import logger
+
+from setting import IMAGE_SETTINGS
+from tool import mpuscript
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.avif')
+
+
+def collect_paths(targets):
+    """文件和目录（递归）-> 图片路径列表"""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            for root, _, files in os.walk(target):
+                paths.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.append(target)
+    return paths
+
+
+def print_progress(done, total, result, elapsed):
+    """默认的进度输出"""
+    rate = done / elapsed if elapsed else 0
+    eta = (total - done) / rate if rate else 0
+    detail = result.get('src') or result.get('error')
+    sys.stdout.write(f"[{done}/{total}] {result['status']:<12} {result['path']} -> {detail} "
+                     f"({rate:.1f} 张/s，剩余约 {eta:.0f}s)\n")
+    sys.stdout.flush()
+
+
+class BatchUploader:
+    """
+    批量上传
+    Args:
+        processes: 压缩进程数
+        upload_threads: 上传线程数
+        max_pending: 同时处理中的图片数上限，默认为进程数的 2 倍
+        progress: 进度回调 progress(已完成数, 总数, 结果, 已用秒数)
+    """
+
+    def __init__(self, processes=IMAGE_SETTINGS['BATCH_PROCESSES'], upload_threads=IMAGE_SETTINGS['BATCH_UPLOAD_THREADS'],
+                 max_pending=None, progress=print_progress):
+        self.processes = processes
+        self.upload_threads = upload_threads
+        self.max_pending = max_pending or processes * 2
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._done = 0
+        # 本批次中正在处理的内容哈希 -> Event，同一批次里的重复图片等第一张处理完再复用结果
+        self._inflight = {}
+
+    def _upload_one(self, path, process_pool, upload_pool):
+        start = time.perf_counter()
+        result = {'path': path, 'status': 'failed', 'digest': None, 'src': None, 'error': None}
+        try:
+            with open(path, 'rb') as f:
+                digest, source = mpuscript._read_hashed(f)
+            result['digest'] = digest
+            with self._lock:
+                event = self._inflight.get(digest)
+                owner = event is None
+                if owner:
+                    event = self._inflight[digest] = threading.Event()
+            if not owner:
+                event.wait()
+            try:
+                manifest = self._process(digest, source, process_pool, upload_pool)
+            finally:
+                if owner:
+                    event.set()
+            result['status'] = manifest.pop('_status')
+            result['src'] = manifest['src']
+            result['manifest'] = manifest
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            logger.error(f"图片上传失败 {path}: {result['error']}")
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        return result
+
+    @staticmethod
+    def _process(digest, source, process_pool, upload_pool):
+        manifest = mpuscript._stored_manifest(digest)
+        if manifest is not None:
+            mpuscript._count('deduplicated')
+            return {**mpuscript.ensure_placeholder(digest, manifest, source), '_status': 'deduplicated'}
+        variants, placeholder = process_pool.submit(mpuscript.encode_variants, source.getvalue()).result()
+        futures = [(width, height, fmt, upload_pool.submit(
+            mpuscript.upload_object, f"{digest}-{width}w.{fmt}", data, mpuscript.MIME_TYPES[fmt]))
+            for width, height, fmt, data in variants]
+        uploaded = [(width, height, fmt, future.result()) for width, height, fmt, future in futures]
+        return {**mpuscript.store_manifest(digest, uploaded, placeholder), '_status': 'uploaded'}
+
+    def run(self, paths):
+        """
+        上传全部图片
+        Returns:
+            dict: {'results': [每张图片的结果，与 paths 顺序一致], 'summary': 汇总}
+        """
+        if mpuscript.s3_client is None:
+            raise RuntimeError("图床未配置（R2_* 或 IMAGE_LOCAL_STORAGE）")
+        total = len(paths)
+        start = time.perf_counter()
+        stats_before = mpuscript.get_upload_stats()
+        self._done = 0
+        self._inflight.clear()
+
+        # forkserver: 进程从预先导入好 mpuscript 的干净进程 fork，不继承本进程的线程和锁
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['tool.mpuscript'])
+
+        def task(path):
+            result = self._upload_one(path, process_pool, upload_pool)
+            with self._lock:
+                self._done += 1
+                if self.progress:
+                    self.progress(self._done, total, result, time.perf_counter() - start)
+            return result
+
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=context) as process_pool, \
+                ThreadPoolExecutor(max_workers=self.upload_threads) as upload_pool, \
+                ThreadPoolExecutor(max_workers=self.max_pending) as task_pool:
+            results = list(task_pool.map(task, paths))
+
+        elapsed = time.perf_counter() - start
+        summary = {'total': total, 'elapsed_s': round(elapsed, 2),
+                   'images_per_s': round(total / elapsed, 2) if elapsed else 0}
+        for status in ('uploaded', 'deduplicated', 'failed'):
+            summary[status] = sum(1 for result in results if result['status'] == status)
+        stats_after = mpuscript.get_upload_stats()
+        summary['bytes'] = stats_after['bytes'] - stats_before['bytes']
+        summary['retries'] = stats_after['retries'] - stats_before['retries']
+        return {'results': results, 'summary': summary}
+
+
+def batch_upload(paths, **kwargs):
+    """批量上传的函数入口，参数见 BatchUploader"""
+    return BatchUploader(**kwargs).run(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量上传图片到图床')
+    parser.add_argument('targets', nargs='+', help='图片文件或目录')
+    parser.add_argument('--processes', type=int, default=IMAGE_SETTINGS['BATCH_PROCESSES'], help='压缩进程数')
+    parser.add_argument('--threads', type=int, default=IMAGE_SETTINGS['BATCH_UPLOAD_THREADS'], help='上传线程数')
+    parser.add_argument('--report', help='把每张图片的结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.targets)
+    report = batch_upload(paths, processes=args.processes, upload_threads=args.threads)
+    summary = report['summary']
+    print(f"✅ 完成 {summary['total']} 张: 上传 {summary['uploaded']}，已存在 {summary['deduplicated']}，"
+          f"失败 {summary['failed']}，重试 {summary['retries']} 次，{summary['bytes'] / 1024 / 1024:.1f}MB，"
+          f"耗时 {summary['elapsed_s']}s（{summary['images_per_s']} 张/s）")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
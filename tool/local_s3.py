@@ -0,0 +1,94 @@
+"""
+本地图床（S3 替身）
+实现图床代码用到的 boto3 S3 客户端接口子集，对象保存为 <root>/<bucket>/<key>，
+未配置 R2 时用于开发和测试（IMAGE_LOCAL_STORAGE），root 在 static/ 下时可直接通过静态路由访问。
+"""
+
+import os
+import random
+import shutil
+import threading
+
+from botocore.exceptions import ClientError
+
+
+def _error(status, code, operation, message=''):
+    """与 boto3 一致的 ClientError（带 HTTP 状态码）"""
+    return ClientError({'Error': {'Code': code, 'Message': message},
+                        'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+
+class LocalS3Client:
+    """
+    boto3 S3 客户端的本地实现
+    支持: upload_fileobj、put_object、head_object、get_object、delete_object
+    failure_rate > 0 时写操作按概率返回 503，用于验证重试
+    """
+
+    def __init__(self, root, failure_rate=0.0):
+        self.root = root
+        self.failure_rate = failure_rate
+        self._lock = threading.Lock()
+        self.calls = {'upload_fileobj': 0, 'put_object': 0, 'failures': 0}
+
+    def _count(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+            if self.failure_rate and random.random() < self.failure_rate:
+                self.calls['failures'] += 1
+                raise _error(503, 'SlowDown', operation, 'Please reduce your request rate.')
+
+    def _path(self, bucket, key):
+        path = os.path.normpath(os.path.join(self.root, bucket, key))
+        if not path.startswith(os.path.normpath(os.path.join(self.root, bucket)) + os.sep):
+            raise _error(400, 'InvalidObjectName', 'PutObject', key)
+        return path
+
+    def _write(self, bucket, key, fileobj):
+        path = self._path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp{os.getpid()}-{threading.get_ident()}'
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, path)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        self._count('upload_fileobj')
+        self._write(Bucket, Key, Fileobj)
+
+    def put_object(self, Bucket, Key, Body=b'', **kwargs):
+        self._count('put_object')
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(Body if isinstance(Body, bytes) else Body.read())
+        return {}
+
+    def head_object(self, Bucket, Key):
+        try:
+            stat = os.stat(self._path(Bucket, Key))
+        except OSError:
+            raise _error(404, '404', 'HeadObject', 'Not Found')
+        return {'ContentLength': stat.st_size}
+
+    def get_object(self, Bucket, Key):
+        try:
+            f = open(self._path(Bucket, Key), 'rb')
+        except OSError:
+            raise _error(404, 'NoSuchKey', 'GetObject', 'Not Found')
+        return {'Body': f, 'ContentLength': os.fstat(f.fileno()).st_size}
+
+    def delete_object(self, Bucket, Key):
+        try:
+            os.remove(self._path(Bucket, Key))
+        except OSError:
+            pass
+        return {}
+
+    def public_url(self, bucket, key):
+        """对象的访问地址：root 在 static/ 下时返回站内路径，否则返回 file 路径"""
+        path = self._path(bucket, key)
+        relative = os.path.relpath(path, 'static')
+        if not relative.startswith('..'):
+            return '/' + relative.replace(os.sep, '/')
+        return 'file://' + os.path.abspath(path)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+翻译目录预加载
+Flask-Babel 默认在每个语言第一次被请求时才解析 .mo 文件，并缓存在各 worker 自己的内存里。
+gunicorn 使用 preload_app，这里在 master 进程（fork 之前）把所有语言的目录解析进
+Flask-Babel 的 Domain 缓存，再由 gunicorn 的 pre_fork 钩子 gc.freeze()，
+worker 直接以写时复制方式共享这些页面，首个请求也不再承担解析开销。
+"""
+
+import gc
+import sys
+import time
+
+from flask_babel import get_translations
+from loguru import logger
+
+# 预加载结果：{语言: {'messages': 条目数, 'load_ms': 耗时, 'memory_kb': 估算内存}}
+_catalog_stats = {}
+
+
+def _catalog_size(translations):
+    """估算目录占用的内存（字典本身 + 键值字符串）"""
+    catalog = getattr(translations, '_catalog', {})
+    size = sys.getsizeof(catalog)
+    for key, value in catalog.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+def preload_translations(app):
+    """
+    预加载全部语言的翻译目录
+    Args:
+        app: Flask应用实例
+    Returns:
+        dict: 每种语言的加载统计
+    """
+    total_start = time.time()
+    for code in app.config['BABEL_SUPPORTED_LOCALES']:
+        # 在该语言的请求上下文中加载，缓存键与线上请求完全一致
+        with app.test_request_context(f'/{code}/'):
+            start = time.time()
+            translations = get_translations()
+            elapsed = (time.time() - start) * 1000
+        _catalog_stats[code] = {
+            'messages': len(getattr(translations, '_catalog', {})),
+            'load_ms': round(elapsed, 2),
+            'memory_kb': round(_catalog_size(translations) / 1024, 1)
+        }
+
+    total_ms = (time.time() - total_start) * 1000
+    total_kb = sum(item['memory_kb'] for item in _catalog_stats.values())
+    logger.info(f"🌐 翻译目录预加载完成: {len(_catalog_stats)} 种语言，"
+                f"耗时 {total_ms:.1f}ms，约 {total_kb:.0f}KB")
+    return get_translation_stats()
+
+
+def get_translation_stats():
+    """获取预加载统计"""
+    return dict(_catalog_stats)
+
+
+def freeze_shared_objects():
+    """
+    把当前所有对象移入永久代，fork 之后 GC 不再扫描（写入）它们，
+    避免共享的目录页面因 GC 而被复制。由 gunicorn pre_fork 钩子调用。
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info(f"已冻结 {gc.get_freeze_count()} 个对象，供 worker 共享")
+
+
+if __name__ == "__main__":
+    # 输出每种语言的加载耗时和内存
+    from run import app
+
+    stats = preload_translations(app)
+    print(f"{'语言':<6}{'条目':>8}{'耗时(ms)':>12}{'内存(KB)':>12}")
+    for code, item in stats.items():
+        print(f"{code:<6}{item['messages']:>8}{item['load_ms']:>12.2f}{item['memory_kb']:>12.1f}")